@@ -0,0 +1,68 @@
+from spade.agent import Agent
+
+from utils.messaging import ContentMessage
+
+from utils.transport import (
+    TRANSPORT_LOOPBACK,
+    TRANSPORT_XMPP,
+    LoopbackRouter,
+    register_local,
+    transport_mode,
+    unregister_local,
+)
+
+
+class HenHouseAgent(Agent):
+    # Transport lokalny nadpisuje wewnętrzne metody SPADE 4.1.2 (przypiętego
+    # w requirements.txt): dispatch, _async_connect, _async_start i
+    # _async_stop. Przy podbiciu SPADE trzeba je porównać z nową wersją Agent.
+    def __init__(
+        self, jid: str, password: str, port: int = 5222, verify_security: bool = False
+    ):
+        super().__init__(jid, password, port, verify_security)
+
+        self.transport: str = transport_mode()
+        if self.transport != TRANSPORT_XMPP:
+            self.container = LoopbackRouter(self.container, self.transport)
+
+    def dispatch(self, msg):
+        # Wiadomość z transportu lokalnego niesie treść jako żywy dict nadawcy.
+        # Każde pasujące zachowanie dostaje własną kopię, tak jak przy XMPP,
+        # gdzie treść jest dekodowana osobno z body.
+        # Reszta to kopia Agent.dispatch ze SPADE 4.1.2 (łącznie z traces).
+        if not isinstance(msg, ContentMessage):
+            return super().dispatch(msg)
+
+        matched = [b for b in self.behaviours if b.match(msg)]
+        if not matched:
+            return super().dispatch(msg)
+
+        tasks = []
+        for behaviour in matched:
+            tasks.append(self.submit(behaviour.enqueue(msg.copy())))
+            self.traces.append(msg, category=str(behaviour))
+        return tasks
+
+    async def _async_connect(self) -> None:
+        if self.transport == TRANSPORT_LOOPBACK:
+            print(f"[TRANSPORT] {self.jid}: tryb loopback, pomijam logowanie XMPP.")
+            return
+        await super()._async_connect()
+
+    async def _async_start(self, auto_register: bool = True) -> None:
+        await super()._async_start(auto_register=auto_register)
+        if self.transport != TRANSPORT_XMPP:
+            register_local(self)
+
+    async def _async_stop(self) -> None:
+        unregister_local(self)
+
+        if self.transport != TRANSPORT_LOOPBACK:
+            await super()._async_stop()
+            return
+
+        for behav in self.behaviours:
+            behav.kill()
+        if self.web.is_started():
+            await self.web.runner.cleanup()
+        self._alive.clear()
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class FlockSnapshot:
+    # Ostatnia agresja i głód każdej kury w tablicach NumPy - zapis O(1),
+    # żeby przegląd całego stada był jedną wektorową operacją.
+    def __init__(self, capacity: int = 1024):
+        capacity = max(1, int(capacity))
+        self.hen_ids: list[str] = []
+        self._slot: dict[str, int] = {}
+        self._aggression = np.zeros(capacity, dtype=np.float64)
+        self._hunger = np.zeros(capacity, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.hen_ids)
+
+    @property
+    def aggression(self) -> np.ndarray:
+        return self._aggression[: len(self.hen_ids)]
+
+    @property
+    def hunger(self) -> np.ndarray:
+        return self._hunger[: len(self.hen_ids)]
+
+    def set(self, hen_id: str, aggression: int, hunger: int) -> None:
+        idx = self._slot.get(hen_id)
+        if idx is None:
+            idx = len(self.hen_ids)
+            if idx == len(self._aggression):
+                self._aggression = np.resize(self._aggression, idx * 2)
+                self._hunger = np.resize(self._hunger, idx * 2)
+            self._slot[hen_id] = idx
+            self.hen_ids.append(hen_id)
+
+        self._aggression[idx] = aggression
+        self._hunger[idx] = hunger
+
+    def remove(self, hen_id: str) -> None:
+        idx = self._slot.pop(hen_id, None)
+        if idx is None:
+            return
+
+        last = len(self.hen_ids) - 1
+        if idx != last:
+            moved = self.hen_ids[last]
+            self.hen_ids[idx] = moved
+            self._slot[moved] = idx
+            self._aggression[idx] = self._aggression[last]
+            self._hunger[idx] = self._hunger[last]
+        self.hen_ids.pop()
+
+
+def _zscores(values: np.ndarray) -> tuple[float, float, np.ndarray]:
+    mean = float(values.mean())
+    std = float(values.std())
+    if std <= 0:
+        return mean, std, np.zeros_like(values)
+    return mean, std, (values - mean) / std
+
+
+def detect_anomalies(
+    snapshot: FlockSnapshot,
+    z_threshold: float = 3.0,
+    percentiles: tuple[float, float] = (5.0, 95.0),
+    max_reported: int = 20,
+) -> dict:
+    aggr = snapshot.aggression
+    hunger = snapshot.hunger
+
+    aggr_mean, aggr_std, aggr_z = _zscores(aggr)
+    hunger_mean, hunger_std, hunger_z = _zscores(hunger)
+
+    lo, hi = percentiles
+    aggr_band = np.percentile(aggr, [lo, hi])
+    hunger_band = np.percentile(hunger, [lo, hi])
+
+    score = np.maximum(np.abs(aggr_z), np.abs(hunger_z))
+    outliers = np.flatnonzero(score >= z_threshold)
+
+    # najbardziej odstające na początku
+    top = outliers[np.argsort(-score[outliers], kind="stable")[:max_reported]]
+
+    return {
+        "hens": len(snapshot),
+        "aggression": {
+            "mean": round(aggr_mean, 2),
+            "std": round(aggr_std, 2),
+            "band": [round(float(v), 2) for v in aggr_band],
+        },
+        "hunger": {
+            "mean": round(hunger_mean, 2),
+            "std": round(hunger_std, 2),
+            "band": [round(float(v), 2) for v in hunger_band],
+        },
+        "z_threshold": float(z_threshold),
+        "outlier_count": int(outliers.size),
+        "outliers": [
+            {
+                "hen_id": snapshot.hen_ids[i],
+                "aggression": int(aggr[i]),
+                "hunger": int(hunger[i]),
+                "z_aggression": round(float(aggr_z[i]), 2),
+                "z_hunger": round(float(hunger_z[i]), 2),
+            }
+            for i in top.tolist()
+        ],
+    }
@@ -1,14 +1,22 @@
 import asyncio
 
-from spade.agent import Agent
-
+from agents.base_agent import HenHouseAgent
+from agents.behavior_and_alarm.anomaly import FlockSnapshot
 from agents.behavior_and_alarm.behavior_and_alarm_agent_behaviour import (
+    AlarmFlushBehaviour,
+    AlertReceiveBehaviour,
+    AnomalySweepBehaviour,
     ReceiveBehaviour,
 )
+from agents.behavior_and_alarm.stats import BehaviorStats
+from utils.alarms import SILO_ALARM_TYPES, AlarmAggregator
 from utils.config_loader import load_config, get_agent_credentials
+from utils.hashring import ConsistentHashRing
+from utils.messaging import NO_MESSAGES, conversation_template
+from utils.topology import behavior_ring, behavior_settings
 
 
-class BehaviorAndAlarmAgent(Agent):
+class BehaviorAndAlarmAgent(HenHouseAgent):
     def __init__(
         self, jid: str, password: str, port: int = 5222, verify_security: bool = False
     ):
@@ -22,15 +30,41 @@ class BehaviorAndAlarmAgent(Agent):
 
         self.regulate_min_interval_sec: float = 2.0
 
+        # statystyki strumieniowe per kura
+        self.stats: BehaviorStats | None = None
+        self.ewma_alpha: float = 0.4
+        self.stats_window_samples: int = 12
+        self.alarm_min_fraction_above: float = 0.5
+        self.lighting_lead_s: float = 2.5
+
+        self.alarms: AlarmAggregator = AlarmAggregator()
+        self.alarm_flush_interval_s: float = 1.0
+        # tyle spokojnych próbek z rzędu zamyka alarm agresji
+        self.alarm_resolve_after_samples: int = 3
+
+        # opcjonalny przegląd anomalii całego stada (NumPy)
+        self.snapshot: FlockSnapshot | None = None
+        self.anomaly_period_s: float = 10.0
+        self.anomaly_z_threshold: float = 3.0
+        self.anomaly_percentiles: tuple[float, float] = (5.0, 95.0)
+        self.anomaly_min_hens: int = 20
+        self.anomaly_max_reported: int = 20
+
         self.ui_jid: str | None = None
         self.logger_jid: str | None = None
         self.lighting_jid: str | None = None
 
+        # shardy zachowania - ten agent ocenia tylko swoją partycję kur
+        self.ring: ConsistentHashRing | None = None
+
+    def owner_of(self, hen_id: str) -> str:
+        return self.ring.node_for(hen_id) or str(self.jid.bare)
+
     async def setup(self):
-        print("[BEHAV] Agent uruchomiony.")
         cfg = load_config()
-
-        beh = cfg.get("behavior", {}) or {}
+        beh = behavior_settings(cfg, str(self.jid.bare))
+        self.ring = behavior_ring(cfg)
+        print(f"[BEHAV] Agent uruchomiony. Shardy: {len(self.ring)}")
 
         self.aggression_threshold = int(
             beh.get("aggression_threshold", self.aggression_threshold)
@@ -45,11 +79,75 @@ class BehaviorAndAlarmAgent(Agent):
             beh.get("regulate_min_interval_sec", self.regulate_min_interval_sec)
         )
 
+        self.ewma_alpha = float(beh.get("ewma_alpha", self.ewma_alpha))
+        self.stats_window_samples = int(
+            beh.get("stats_window_samples", self.stats_window_samples)
+        )
+        self.alarm_min_fraction_above = float(
+            beh.get("alarm_min_fraction_above", self.alarm_min_fraction_above)
+        )
+        self.lighting_lead_s = float(beh.get("lighting_lead_s", self.lighting_lead_s))
+
+        self.stats = BehaviorStats(
+            threshold=self.aggression_threshold,
+            alpha=self.ewma_alpha,
+            window=self.stats_window_samples,
+        )
+
         self.ui_jid = cfg["agents"]["ui"]["jid"]
         self.logger_jid = cfg["agents"]["logger"]["jid"]
         self.lighting_jid = cfg["agents"]["lighting"]["jid"]
 
-        self.add_behaviour(ReceiveBehaviour())
+        alarms_cfg = beh.get("alarms", {}) or {}
+        self.alarms = AlarmAggregator(
+            coalesce_window_s=float(alarms_cfg.get("coalesce_window_s", 10.0)),
+            resolve_after_s=float(alarms_cfg.get("resolve_after_s", 30.0)),
+            max_per_s=float(alarms_cfg.get("max_per_s", 5.0)),
+            burst=int(alarms_cfg.get("burst", 20)),
+            sticky_types=alarms_cfg.get("sticky_types", SILO_ALARM_TYPES),
+        )
+        self.alarm_flush_interval_s = float(
+            alarms_cfg.get("flush_interval_s", self.alarm_flush_interval_s)
+        )
+        self.alarm_resolve_after_samples = max(
+            1,
+            int(
+                alarms_cfg.get(
+                    "resolve_after_samples", self.alarm_resolve_after_samples
+                )
+            ),
+        )
+
+        # pas alarmowy i pas rutynowy - rozłączne szablony, każda wiadomość
+        # trafia do dokładnie jednej kolejki
+        alerts = conversation_template("alerts")
+        self.add_behaviour(AlertReceiveBehaviour(), alerts)
+        self.add_behaviour(ReceiveBehaviour(), ~alerts)
+        self.add_behaviour(
+            AlarmFlushBehaviour(period=self.alarm_flush_interval_s), NO_MESSAGES
+        )
+
+        anomaly_cfg = beh.get("anomaly", {}) or {}
+        if anomaly_cfg.get("enabled"):
+            self.anomaly_period_s = float(
+                anomaly_cfg.get("period_s", self.anomaly_period_s)
+            )
+            self.anomaly_z_threshold = float(
+                anomaly_cfg.get("z_threshold", self.anomaly_z_threshold)
+            )
+            lo, hi = anomaly_cfg.get("percentiles", self.anomaly_percentiles)
+            self.anomaly_percentiles = (float(lo), float(hi))
+            self.anomaly_min_hens = int(
+                anomaly_cfg.get("min_hens", self.anomaly_min_hens)
+            )
+            self.anomaly_max_reported = int(
+                anomaly_cfg.get("max_reported", self.anomaly_max_reported)
+            )
+
+            self.snapshot = FlockSnapshot()
+            self.add_behaviour(
+                AnomalySweepBehaviour(period=self.anomaly_period_s), NO_MESSAGES
+            )
 
 
 async def main():
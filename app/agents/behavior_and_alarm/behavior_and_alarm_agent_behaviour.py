@@ -1,19 +1,74 @@
 import time
 
-from spade.behaviour import CyclicBehaviour
+from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
 
-from utils.messaging import parse_content, build_message
+from agents.behavior_and_alarm.anomaly import detect_anomalies
+from utils.alarms import FEED_RESTORED, SILO_ALARM_TYPES
+from utils.messaging import (
+    parse_content,
+    build_message,
+    batch_entries,
+    forward_entries,
+)
+from utils.topology import parse_membership
 
 
 def _clamp(v: int, lo: int, hi: int) -> int:
     return max(lo, min(hi, v))
 
 
+def _critical_event_messages(agent, event_type: str, payload: dict) -> list:
+    msg_ui = build_message(
+        to=agent.ui_jid,
+        performative="inform",
+        conversation="update_state",
+        content={
+            "type": "critical_event",
+            "source": str(agent.jid),
+            "payload": {
+                "event": event_type,
+                **(payload or {}),
+            },
+        },
+    )
+
+    msg_log = build_message(
+        to=agent.logger_jid,
+        performative="inform",
+        conversation="logging",
+        content={
+            "type": "log_event",
+            "source": str(agent.jid),
+            "payload": {
+                "event": event_type,
+                **(payload or {}),
+            },
+        },
+    )
+    return [msg_ui, msg_log]
+
+
+def _behavior_entry(entry: dict) -> dict:
+    return {
+        "hen_id": entry["hen_id"],
+        "hunger": entry.get("hunger", 0),
+        "aggression": entry.get("aggression", 0),
+    }
+
+
+async def _send_alarms(behaviour, emitted: list[tuple[str, dict]]):
+    for event_type, payload in emitted:
+        for msg in _critical_event_messages(behaviour.agent, event_type, payload):
+            await behaviour.send(msg)
+
+
 class ReceiveBehaviour(CyclicBehaviour):
     def __init__(self):
         super().__init__()
         self._last_regulate_at: dict[str, float] = {}
         self._last_sent_aggr: dict[str, int] = {}
+        # spokojne próbki z rzędu dla kur z otwartym alarmem agresji
+        self._calm_samples: dict[str, int] = {}
 
     async def run(self):
         msg = await self.receive(timeout=10)
@@ -25,13 +80,56 @@ class ReceiveBehaviour(CyclicBehaviour):
         msg_type = content.get("type")
 
         if conv == "behavior" and msg_type == "behavior_update":
+            hen_id = content.get("hen_id")
+            owner = self.agent.owner_of(hen_id) if hen_id else None
+            if (
+                owner
+                and owner != str(self.agent.jid.bare)
+                and not content.get("forwarded")
+            ):
+                await forward_entries(
+                    self, owner, "behavior", [content], _behavior_entry
+                )
+                return
             await self.handle_behavior_message(content)
 
-        elif conv == "behavior" and msg_type == "aggression_detected":
-            await self.handle_behavior_message(content)
+        elif conv == "behavior" and msg_type == "flock_state_batch":
+            me = str(self.agent.jid.bare)
+            forwarded = bool(content.get("forwarded"))
+            foreign: dict[str, list[dict]] = {}
+            for entry in batch_entries(content):
+                owner = me if forwarded else self.agent.owner_of(entry["hen_id"])
+                if owner == me:
+                    await self.handle_behavior_message(entry)
+                else:
+                    foreign.setdefault(owner, []).append(entry)
+
+            for owner, entries in foreign.items():
+                await forward_entries(self, owner, "behavior", entries, _behavior_entry)
+
+        elif conv == "membership":
+            membership = parse_membership(content)
+            if membership is not None and membership[0] == "behavior":
+                self.apply_membership(membership[1])
 
-        elif conv == "alerts":
-            await self.handle_external_alert(content)
+    def apply_membership(self, shards: list[str]):
+        me = str(self.agent.jid.bare)
+        self.agent.ring.set_nodes(shards)
+        print(f"[BEHAV] Nowy skład shardów: {self.agent.ring.nodes}")
+
+        # stan dławienia regulacji i statystyki dotyczą tylko własnych kur
+        for state in (
+            self._last_regulate_at,
+            self._last_sent_aggr,
+            self._calm_samples,
+        ):
+            for hen_id in [h for h in state if self.agent.owner_of(h) != me]:
+                del state[hen_id]
+        for hen_id in self.agent.stats.hen_ids():
+            if self.agent.owner_of(hen_id) != me:
+                self.agent.stats.forget(hen_id)
+                if self.agent.snapshot is not None:
+                    self.agent.snapshot.remove(hen_id)
 
     async def handle_behavior_message(self, content: dict):
         hen_id = content.get("hen_id")
@@ -44,9 +142,16 @@ class ReceiveBehaviour(CyclicBehaviour):
             aggression, -self.agent.max_abs_aggression, self.agent.max_abs_aggression
         )
 
-        if abs(aggression) >= int(self.agent.aggression_threshold):
+        now = time.monotonic()
+        stats = self.agent.stats.update(hen_id, aggression, hunger, now)
+        if self.agent.snapshot is not None:
+            self.agent.snapshot.set(hen_id, aggression, hunger)
+
+        if self._is_alarming(stats):
+            self._calm_samples[hen_id] = 0
             print(
-                f"[BEHAV] ALARM: aggression={aggression}, hunger={hunger}, hen_id={hen_id}"
+                f"[BEHAV] ALARM: aggression={aggression}, hunger={hunger}, hen_id={hen_id}, "
+                f"ewma={stats.ewma_aggression:.1f}, above={stats.above_fraction:.0%}"
             )
 
             await self.raise_critical_event(
@@ -56,16 +161,44 @@ class ReceiveBehaviour(CyclicBehaviour):
                     "aggression": aggression,
                     "hunger": hunger,
                     "threshold": self.agent.aggression_threshold,
+                    **stats.summary(),
                 },
             )
+        elif hen_id in self._calm_samples:
+            # histereza - jedna próbka pod progiem nie zamyka alarmu
+            calm = self._calm_samples[hen_id] + 1
+            if calm >= int(self.agent.alarm_resolve_after_samples):
+                del self._calm_samples[hen_id]
+                await self.resolve_critical_event("aggression_alert", hen_id)
+            else:
+                self._calm_samples[hen_id] = calm
+
+        # światło sterowane wygładzoną (i przewidywaną) agresją, nie chwilową
+        max_abs = self.agent.max_abs_aggression
+        target_aggr = _clamp(
+            int(round(stats.projected_aggression(self.agent.lighting_lead_s))),
+            -max_abs,
+            max_abs,
+        )
         await self._maybe_send_aggression_update(
-            hen_id=hen_id, aggression=aggression, hunger=hunger
+            hen_id=hen_id, aggression=target_aggr, hunger=hunger, now=now
+        )
+
+    def _is_alarming(self, stats) -> bool:
+        threshold = int(self.agent.aggression_threshold)
+        if abs(stats.last_aggression) < threshold:
+            return False
+
+        # pojedynczy skok nie wystarcza - agresja musi się utrzymywać
+        if abs(stats.ewma_aggression) >= threshold:
+            return True
+        return stats.window_s > 0 and stats.above_fraction >= float(
+            self.agent.alarm_min_fraction_above
         )
 
     async def _maybe_send_aggression_update(
-        self, hen_id: str, aggression: int, hunger: int
+        self, hen_id: str, aggression: int, hunger: int, now: float
     ):
-        now = time.monotonic()
         last_t = float(self._last_regulate_at.get(hen_id, 0.0))
 
         if (now - last_t) < float(self.agent.regulate_min_interval_sec):
@@ -90,45 +223,13 @@ class ReceiveBehaviour(CyclicBehaviour):
             hunger=hunger,
         )
 
-    async def handle_external_alert(self, content: dict):
-        event_type = (
-            content.get("event_type") or content.get("type") or "external_alert"
-        )
-        payload = content.get("payload", {}) or {}
-
-        print(f"[ALARM] Alert z innego agenta: {event_type}, {payload}")
-        await self.raise_critical_event(event_type, payload)
-
     async def raise_critical_event(self, event_type: str, payload: dict):
-        msg_ui = build_message(
-            to=self.agent.ui_jid,
-            performative="inform",
-            conversation="update_state",
-            content={
-                "type": "critical_event",
-                "source": str(self.agent.jid),
-                "payload": {
-                    "event": event_type,
-                    **(payload or {}),
-                },
-            },
-        )
-        await self.send(msg_ui)
+        emitted = self.agent.alarms.raise_alarm(event_type, payload, time.monotonic())
+        await _send_alarms(self, emitted)
 
-        msg_log = build_message(
-            to=self.agent.logger_jid,
-            performative="inform",
-            conversation="logging",
-            content={
-                "type": "log_event",
-                "source": str(self.agent.jid),
-                "payload": {
-                    "event": event_type,
-                    **(payload or {}),
-                },
-            },
-        )
-        await self.send(msg_log)
+    async def resolve_critical_event(self, event_type: str, hen_id: str | None):
+        emitted = self.agent.alarms.resolve(event_type, hen_id, time.monotonic())
+        await _send_alarms(self, emitted)
 
     async def send_aggression_update_to_lighting(
         self, reason: str, hen_id: str, aggression: int, hunger: int
@@ -148,3 +249,65 @@ class ReceiveBehaviour(CyclicBehaviour):
             },
         )
         await self.send(msg)
+
+
+class AlertReceiveBehaviour(CyclicBehaviour):
+    # osobna kolejka dla conversation == "alerts" - alert nie czeka za
+    # tysiącami rutynowych behavior_update w kolejce ReceiveBehaviour
+    async def run(self):
+        msg = await self.receive(timeout=10)
+        if not msg:
+            return
+        await self.handle_external_alert(parse_content(msg) or {})
+
+    async def handle_external_alert(self, content: dict):
+        event_type = (
+            content.get("event_type") or content.get("type") or "external_alert"
+        )
+        payload = content.get("payload", {}) or {}
+
+        if event_type == FEED_RESTORED:
+            print(f"[ALARM] Pasza uzupełniona: {payload.get('silo')}")
+            emitted = self.agent.alarms.clear_silo(
+                payload.get("clears") or SILO_ALARM_TYPES,
+                payload.get("silo"),
+                time.monotonic(),
+            )
+            await _send_alarms(self, emitted)
+            return
+
+        print(f"[ALARM] Alert z innego agenta: {event_type}, {payload}")
+        emitted = self.agent.alarms.raise_alarm(event_type, payload, time.monotonic())
+        await _send_alarms(self, emitted)
+
+
+class AnomalySweepBehaviour(PeriodicBehaviour):
+    # jeden wektorowy przegląd całej partycji stada, jeden zbiorczy alarm
+    async def run(self):
+        agent = self.agent
+        snapshot = agent.snapshot
+        if snapshot is None or len(snapshot) < int(agent.anomaly_min_hens):
+            return
+
+        report = detect_anomalies(
+            snapshot,
+            z_threshold=agent.anomaly_z_threshold,
+            percentiles=agent.anomaly_percentiles,
+            max_reported=agent.anomaly_max_reported,
+        )
+        if report["outlier_count"] == 0:
+            return
+
+        print(
+            f"[BEHAV] ANOMALIA: {report['outlier_count']}/{report['hens']} kur "
+            f"odstaje (|z| >= {agent.anomaly_z_threshold})"
+        )
+        for msg in _critical_event_messages(agent, "flock_anomaly", report):
+            await self.send(msg)
+
+
+class AlarmFlushBehaviour(PeriodicBehaviour):
+    # zbiorcze update'y, resolve po ciszy i alarmy wstrzymane przez limit
+    async def run(self):
+        emitted = self.agent.alarms.flush(time.monotonic())
+        await _send_alarms(self, emitted)
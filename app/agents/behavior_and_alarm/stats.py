@@ -0,0 +1,104 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class HenStats:
+    # Statystyki strumieniowe jednej kury - stały czas i pamięć na próbkę.
+    # Bufory cykliczne trzymają ostatnie `window` odstępów czasu i ile z nich
+    # kura spędziła powyżej progu agresji; sumy są aktualizowane przyrostowo.
+    window: int
+    samples: int = 0
+
+    last_aggression: int = 0
+    last_hunger: int = 0
+    last_ts: float = 0.0
+
+    ewma_aggression: float = 0.0
+    ewma_hunger: float = 0.0
+    # zmiana agresji na sekundę (wygładzona)
+    aggression_rate: float = 0.0
+
+    _dt: list[float] = field(default_factory=list)
+    _dt_above: list[float] = field(default_factory=list)
+    _pos: int = 0
+    window_s: float = 0.0
+    time_above_s: float = 0.0
+
+    def __post_init__(self):
+        self.window = max(1, int(self.window))
+        self._dt = [0.0] * self.window
+        self._dt_above = [0.0] * self.window
+
+    def update(
+        self, aggression: int, hunger: int, now: float, threshold: int, alpha: float
+    ) -> None:
+        if self.samples == 0:
+            # agresja startuje z neutralnego 0 - pierwszy skok nie przebija progu
+            self.ewma_aggression = alpha * aggression
+            self.ewma_hunger = float(hunger)
+        else:
+            dt = max(0.0, now - self.last_ts)
+            above = abs(self.last_aggression) >= threshold
+
+            pos = self._pos
+            self.window_s += dt - self._dt[pos]
+            self.time_above_s += (dt if above else 0.0) - self._dt_above[pos]
+            self._dt[pos] = dt
+            self._dt_above[pos] = dt if above else 0.0
+            self._pos = (pos + 1) % self.window
+
+            self.ewma_aggression += alpha * (aggression - self.ewma_aggression)
+            self.ewma_hunger += alpha * (hunger - self.ewma_hunger)
+            if dt > 0:
+                rate = (aggression - self.last_aggression) / dt
+                self.aggression_rate += alpha * (rate - self.aggression_rate)
+
+        self.samples += 1
+        self.last_aggression = int(aggression)
+        self.last_hunger = int(hunger)
+        self.last_ts = now
+
+    @property
+    def above_fraction(self) -> float:
+        if self.window_s <= 0:
+            return 0.0
+        return min(1.0, max(0.0, self.time_above_s / self.window_s))
+
+    def projected_aggression(self, lead_s: float) -> float:
+        return self.ewma_aggression + self.aggression_rate * lead_s
+
+    def summary(self) -> dict:
+        return {
+            "ewma_aggression": round(self.ewma_aggression, 2),
+            "ewma_hunger": round(self.ewma_hunger, 2),
+            "aggression_rate": round(self.aggression_rate, 3),
+            "time_above_s": round(self.time_above_s, 1),
+            "above_fraction": round(self.above_fraction, 2),
+        }
+
+
+class BehaviorStats:
+    def __init__(self, threshold: int, alpha: float = 0.3, window: int = 12):
+        self.threshold = int(threshold)
+        self.alpha = min(1.0, max(0.0, float(alpha)))
+        self.window = max(1, int(window))
+        self._hens: dict[str, HenStats] = {}
+
+    def __len__(self) -> int:
+        return len(self._hens)
+
+    def get(self, hen_id: str) -> HenStats | None:
+        return self._hens.get(hen_id)
+
+    def update(self, hen_id: str, aggression: int, hunger: int, now: float) -> HenStats:
+        stats = self._hens.get(hen_id)
+        if stats is None:
+            stats = self._hens[hen_id] = HenStats(window=self.window)
+        stats.update(aggression, hunger, now, self.threshold, self.alpha)
+        return stats
+
+    def forget(self, hen_id: str) -> None:
+        self._hens.pop(hen_id, None)
+
+    def hen_ids(self) -> list[str]:
+        return list(self._hens)
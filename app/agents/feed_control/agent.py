@@ -1,19 +1,25 @@
 import asyncio
 
-from spade.agent import Agent
-
-from agents.feed_control.behaviour import ReceiveBehaviour
+from agents.base_agent import HenHouseAgent
+from agents.feed_control.behaviour import (
+    ControlReceiveBehaviour,
+    FeedingBehaviour,
+    ReceiveBehaviour,
+)
+from agents.feed_control.scheduler import FeedingScheduler
 from models.environment_state import FeedState
 from utils.config_loader import load_config, get_agent_credentials
+from utils.hashring import ConsistentHashRing
+from utils.messaging import NO_MESSAGES, conversation_template
+from utils.topology import behavior_ring, feed_ring, feed_settings
 
 
-class FeedControlAgent(Agent):
+class FeedControlAgent(HenHouseAgent):
     def __init__(
         self, jid: str, password: str, port: int = 5222, verify_security: bool = False
     ):
         super().__init__(jid, password, port, verify_security)
 
-        self.behavior_alarm_jid: str | None = None
         self.ui_jid: str | None = None
         self.logger_jid: str | None = None
 
@@ -23,20 +29,46 @@ class FeedControlAgent(Agent):
 
         self.feed_state: FeedState | None = None
 
-        self.last_fed_at: dict[str, float] = {}
         self.feed_cooldown_s: float = 8.0
+        self.cooldown_wheel_slot_s: float = 0.5
 
         self.max_hens_per_batch: int = 3
 
-        self.last_hunger: dict[str, int] = {}
+        # ostatni znany głód kur + kolejka do karmienia z cooldownem
+        self.scheduler: FeedingScheduler | None = None
+        # głód odebrany od ostatniej rundy karmienia
+        self.pending_hunger: dict[str, int] = {}
+        self.schedule_interval_ms: float = 500.0
+
+        # shardy karmienia - ten agent obsługuje tylko swoją partycję kur
+        self.ring: ConsistentHashRing | None = None
+        self.behavior_ring: ConsistentHashRing | None = None
+
+        # stan do wysyłania powiadomień tylko przy zmianie
+        self.low_feed_active: bool = False
+        self.feed_empty: bool = False
+        self.no_feed_alerted: set[str] = set()
+
+    def owner_of(self, hen_id: str) -> str:
+        return self.ring.node_for(hen_id) or str(self.jid.bare)
+
+    def behavior_owner_of(self, key: str) -> str | None:
+        return self.behavior_ring.node_for(key)
 
     async def setup(self):
-        print("[FEED] Agent uruchomiony.")
         cfg = load_config()
-        feeding_cfg = cfg.get("feeding", {}) or {}
+        feeding_cfg = feed_settings(cfg, str(self.jid.bare))
+        self.ring = feed_ring(cfg)
+        print(f"[FEED] Agent uruchomiony. Shardy: {len(self.ring)}")
 
         self.feed_cooldown_s = float(feeding_cfg.get("feed_cooldown_s", 8))
+        self.cooldown_wheel_slot_s = float(
+            feeding_cfg.get("cooldown_wheel_slot_s", self.cooldown_wheel_slot_s)
+        )
         self.max_hens_per_batch = int(feeding_cfg.get("max_hens_per_batch", 3))
+        self.schedule_interval_ms = float(
+            feeding_cfg.get("schedule_interval_ms", self.schedule_interval_ms)
+        )
 
         self.feed_state = FeedState(
             level=int(feeding_cfg.get("initial_feed_level", 0)),
@@ -47,11 +79,23 @@ class FeedControlAgent(Agent):
         self.hunger_threshold = int(feeding_cfg.get("hunger_threshold", 70))
         self.low_feed_threshold = int(feeding_cfg.get("low_feed_threshold", 10))
 
+        self.scheduler = FeedingScheduler(
+            hunger_threshold=self.hunger_threshold,
+            cooldown_s=self.feed_cooldown_s,
+            wheel_slot_s=self.cooldown_wheel_slot_s,
+        )
+
         self.logger_jid = cfg["agents"]["logger"]["jid"]
         self.ui_jid = cfg["agents"]["ui"]["jid"]
-        self.behavior_alarm_jid = cfg["agents"]["behavior_alarm"]["jid"]
-
-        self.add_behaviour(ReceiveBehaviour())
+        self.behavior_ring = behavior_ring(cfg)
+
+        control = conversation_template("membership") | conversation_template("alerts")
+        self.add_behaviour(ControlReceiveBehaviour(), control)
+        self.add_behaviour(ReceiveBehaviour(), ~control)
+        self.add_behaviour(
+            FeedingBehaviour(period=max(0.01, self.schedule_interval_ms / 1000.0)),
+            NO_MESSAGES,
+        )
 
 
 async def main():
@@ -1,18 +1,37 @@
 import time
 
-from spade.behaviour import CyclicBehaviour
+from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
 
-from utils.messaging import parse_content, build_message
+from utils.messaging import (
+    parse_content,
+    build_message,
+    batch_entries,
+    forward_entries,
+)
+from utils.readiness import wait_until_system_ready
+from utils.topology import parse_membership
 
 
 def _now() -> float:
     return time.monotonic()
 
 
-class ReceiveBehaviour(CyclicBehaviour):
-    async def on_start(self):
-        await self._broadcast_feed_state_update(reason="init")
+def _hunger_of(value) -> int:
+    try:
+        return int(value or 0)
+    except Exception:
+        return 0
+
+
+def _feed_entry(entry: dict) -> dict:
+    hen = {"hen_id": entry["hen_id"], "hunger": _hunger_of(entry.get("hunger", 0))}
+    if "last_fed" in entry:
+        hen["last_fed"] = entry["last_fed"]
+    return hen
 
+
+class ReceiveBehaviour(CyclicBehaviour):
+    # tylko zapisuje ostatni znany głód - decyzje podejmuje FeedingBehaviour
     async def run(self):
         msg = await self.receive(timeout=10)
         if not msg:
@@ -23,87 +42,203 @@ class ReceiveBehaviour(CyclicBehaviour):
         msg_type = content.get("type")
 
         if conv == "feeding" and msg_type in ("hunger_update", "hunger_high"):
-            try:
-                hunger = int(content.get("hunger", 0) or 0)
-            except Exception:
-                hunger = 0
+            hunger = _hunger_of(content.get("hunger", 0))
 
             hen_id = content.get("hen_id")
             if not hen_id:
                 print("[FEED] Brak hen_id w wiadomości - ignoruję.")
                 return
 
-            self.agent.last_hunger[hen_id] = hunger
+            owner = self.agent.owner_of(hen_id)
+            if owner != str(self.agent.jid.bare) and not content.get("forwarded"):
+                await forward_entries(
+                    self,
+                    owner,
+                    "feeding",
+                    [{"hen_id": hen_id, "hunger": hunger}],
+                    _feed_entry,
+                )
+                return
+
+            self.agent.pending_hunger[hen_id] = hunger
 
             print(f"[FEED] Otrzymano hunger={hunger} od hen_id={hen_id}")
 
-            await self.handle_batch_feeding()
+        elif conv == "feeding" and msg_type == "flock_state_batch":
+            entries = batch_entries(content)
+            await self._ingest_entries(
+                entries, forwarded=bool(content.get("forwarded"))
+            )
 
-    async def handle_batch_feeding(self):
-        if not self.agent.feed_state:
+            print(f"[FEED] Otrzymano stan stada: {len(entries)} kur")
+
+    async def _ingest_entries(self, entries: list[dict], forwarded: bool = False):
+        me = str(self.agent.jid.bare)
+        pending = self.agent.pending_hunger
+        foreign: dict[str, list[dict]] = {}
+
+        for entry in entries:
+            hunger = _hunger_of(entry.get("hunger", 0))
+            owner = me if forwarded else self.agent.owner_of(entry["hen_id"])
+            if owner == me:
+                if "last_fed" in entry:
+                    self._restore_cooldown(entry["hen_id"], hunger, entry["last_fed"])
+                    continue
+                pending[entry["hen_id"]] = hunger
+            else:
+                foreign.setdefault(owner, []).append(entry)
+
+        for owner, hens in foreign.items():
+            await forward_entries(self, owner, "feeding", hens, _feed_entry)
+
+    def _restore_cooldown(self, hen_id: str, hunger: int, last_fed) -> None:
+        # last_fed to czas ścienny - zegar monotoniczny innego procesu jest nieporównywalny
+        scheduler = self.agent.scheduler
+        self.agent.pending_hunger.pop(hen_id, None)
+        scheduler.update(hen_id, hunger)
+        try:
+            ago = max(0.0, time.time() - float(last_fed))
+        except (TypeError, ValueError):
             return
+        now = _now()
+        scheduler.restore_fed(hen_id, now - ago, now)
 
-        if int(self.agent.feed_state.level) <= 0:
-            for hen_id, hunger in list(self.agent.last_hunger.items()):
-                if int(hunger) >= int(self.agent.hunger_threshold):
-                    await self.send_no_feed_alert(hen_id=hen_id, hunger=int(hunger))
-            await self._broadcast_feed_state_update(reason="no_feed")
-            return
 
-        candidates = [
-            (hen_id, int(hunger))
-            for hen_id, hunger in (self.agent.last_hunger or {}).items()
-            if int(hunger) >= int(self.agent.hunger_threshold)
-        ]
-        if not candidates:
+class ControlReceiveBehaviour(CyclicBehaviour):
+    # pas priorytetowy (membership, alerts) z własną kolejką - zmiana składu
+    # shardów nie czeka za falą hunger_update
+    async def run(self):
+        msg = await self.receive(timeout=10)
+        if not msg:
             return
 
-        candidates.sort(key=lambda x: x[1], reverse=True)
+        content = parse_content(msg) or {}
+        conv = msg.get_metadata("conversation")
 
-        fed_any = False
-        fed_count = 0
+        if conv == "membership":
+            membership = parse_membership(content)
+            if membership is None:
+                return
+            role, shards = membership
+            if role == "feeding":
+                await self._apply_membership(shards)
+            else:
+                self.agent.behavior_ring.set_nodes(shards)
+
+        elif conv == "alerts":
+            print(f"[FEED] Alert: {content.get('type')}, {content.get('payload')}")
+
+    async def _apply_membership(self, shards: list[str]):
+        me = str(self.agent.jid.bare)
+        self.agent.ring.set_nodes(shards)
+        print(f"[FEED] Nowy skład shardów: {self.agent.ring.nodes}")
+
+        # oddaj kury, które należą teraz do innych shardów
+        scheduler = self.agent.scheduler
+        known = dict(scheduler.items())
+        known.update(self.agent.pending_hunger)
+
+        mono_now, wall_now = _now(), time.time()
+        handoff: dict[str, list[dict]] = {}
+        for hen_id, hunger in known.items():
+            owner = self.agent.owner_of(hen_id)
+            if owner != me:
+                entry = {"hen_id": hen_id, "hunger": int(hunger)}
+                fed_at = scheduler.fed_at(hen_id)
+                if fed_at is not None:
+                    entry["last_fed"] = wall_now - (mono_now - fed_at)
+                handoff.setdefault(owner, []).append(entry)
+
+        for owner, hens in handoff.items():
+            for entry in hens:
+                scheduler.remove(entry["hen_id"])
+                self.agent.pending_hunger.pop(entry["hen_id"], None)
+                self.agent.no_feed_alerted.discard(entry["hen_id"])
+            print(f"[FEED] Przekazuję {len(hens)} kur do {owner}")
+            await forward_entries(self, owner, "feeding", hens, _feed_entry)
+
+
+class FeedingBehaviour(PeriodicBehaviour):
+    async def on_start(self):
+        await wait_until_system_ready()
+        await self._broadcast_feed_state_update(reason="init")
 
-        for hen_id, hunger in candidates:
-            if fed_count >= int(self.agent.max_hens_per_batch):
-                break
+    async def run(self):
+        pending = self.agent.pending_hunger
+        if pending:
+            self.agent.pending_hunger = {}
+            scheduler = self.agent.scheduler
+            for hen_id, hunger in pending.items():
+                scheduler.update(hen_id, hunger)
 
-            if int(self.agent.feed_state.level) <= 0:
-                await self.send_no_feed_alert(hen_id=hen_id, hunger=hunger)
-                break
+        await self.handle_batch_feeding()
 
-            now = _now()
-            last = float(self.agent.last_fed_at.get(hen_id, 0.0))
-            if now - last < float(self.agent.feed_cooldown_s):
-                continue
+    async def handle_batch_feeding(self):
+        if not self.agent.feed_state:
+            return
+
+        scheduler = self.agent.scheduler
+        now = _now()
+        candidates = scheduler.pop_batch(int(self.agent.max_hens_per_batch), now)
 
+        if int(self.agent.feed_state.level) <= 0:
+            for hen_id, _ in candidates:
+                scheduler.requeue(hen_id)
+            await self._handle_no_feed(candidates)
+            return
+
+        if self.agent.feed_empty:
+            await self.send_feed_restored(clears=["no_feed"])
+        self.agent.no_feed_alerted.clear()
+        self.agent.feed_empty = False
+
+        fed: list[dict] = []
+
+        for i, (hen_id, hunger) in enumerate(candidates):
             portion = min(
                 int(self.agent.feed_state.level), int(self.agent.portion_size)
             )
             if portion <= 0:
-                await self.send_no_feed_alert(hen_id=hen_id, hunger=hunger)
+                for rest_id, _ in candidates[i:]:
+                    scheduler.requeue(rest_id)
+                await self._handle_no_feed(candidates[i:])
                 break
 
             self.agent.feed_state.level -= portion
-            self.agent.last_fed_at[hen_id] = now
+            scheduler.mark_fed(hen_id, now)
 
             print(
                 f"[FEED] Karmienie: hen_id={hen_id}, porcja={portion}, zapas={self.agent.feed_state.level}"
             )
 
-            await self.send_feed_dispensed_to_hen(hen_id=hen_id, amount=portion)
-
-            await self.notify_feed_dispensed(
-                hen_id=hen_id, portion=portion, hunger_before=hunger
+            fed.append(
+                {"hen_id": hen_id, "portion": portion, "hunger_before": int(hunger)}
             )
 
-            fed_any = True
-            fed_count += 1
-
-        if fed_any:
+        if fed:
+            await self.send_feed_to_hens(fed)
+            await self.notify_feed_batch_dispensed(fed)
             await self._broadcast_feed_state_update(reason="batch_feed")
 
-        if int(self.agent.feed_state.level) <= int(self.agent.low_feed_threshold):
+        low = int(self.agent.feed_state.level) <= int(self.agent.low_feed_threshold)
+        if low and not self.agent.low_feed_active:
             await self.send_low_feed_warning()
+        elif not low and self.agent.low_feed_active:
+            await self.send_feed_restored(clears=["low_feed_warning"])
+        self.agent.low_feed_active = low
+
+    async def _handle_no_feed(self, candidates: list[tuple[str, int]]):
+        # alarm tylko dla kur, które właśnie byłyby nakarmione, raz na kurę
+        alerted = self.agent.no_feed_alerted
+        for hen_id, hunger in candidates:
+            if hen_id in alerted:
+                continue
+            alerted.add(hen_id)
+            await self.send_no_feed_alert(hen_id=hen_id, hunger=int(hunger))
+
+        if not self.agent.feed_empty:
+            self.agent.feed_empty = True
+            await self._broadcast_feed_state_update(reason="no_feed")
 
     async def _broadcast_feed_state_update(self, reason: str):
         if not self.agent.feed_state:
@@ -145,35 +280,44 @@ class ReceiveBehaviour(CyclicBehaviour):
         )
         await self.send(msg_log)
 
-    async def send_feed_dispensed_to_hen(self, hen_id: str, amount: int):
-        msg_hen = build_message(
-            to=hen_id,
-            performative="inform",
-            conversation="feeding",
-            content={
-                "type": "feed_dispensed",
-                "hen_id": hen_id,
-                "amount": int(amount),
-            },
-        )
-        await self.send(msg_hen)
+    async def send_feed_to_hens(self, fed: list[dict]):
+        # jedna wiadomość na konto XMPP - stado (flock) dostaje całą swoją listę
+        by_jid: dict[str, list[dict]] = {}
+        for entry in fed:
+            bare = entry["hen_id"].split("/", 1)[0]
+            by_jid.setdefault(bare, []).append(
+                {"hen_id": entry["hen_id"], "amount": int(entry["portion"])}
+            )
+
+        for bare, hens in by_jid.items():
+            msg_hen = build_message(
+                to=bare,
+                performative="inform",
+                conversation="feeding",
+                content={
+                    "type": "feed_batch_dispensed",
+                    "source": str(self.agent.jid),
+                    "hens": hens,
+                },
+            )
+            await self.send(msg_hen)
+
+    async def notify_feed_batch_dispensed(self, fed: list[dict]):
+        payload = {
+            "hens": fed,
+            "total_portion": sum(int(e["portion"]) for e in fed),
+            "remaining_feed": int(self.agent.feed_state.level),
+            "capacity": int(self.agent.feed_state.capacity),
+        }
 
-    async def notify_feed_dispensed(
-        self, hen_id: str, portion: int, hunger_before: int
-    ):
         msg_ui = build_message(
             to=self.agent.ui_jid,
             performative="inform",
             conversation="update_state",
             content={
-                "type": "feed_dispensed",
+                "type": "feed_batch_dispensed",
                 "source": str(self.agent.jid),
-                "payload": {
-                    "hen_id": hen_id,
-                    "portion": int(portion),
-                    "remaining_feed": int(self.agent.feed_state.level),
-                    "hunger_before": int(hunger_before),
-                },
+                "payload": payload,
             },
         )
         await self.send(msg_ui)
@@ -185,13 +329,7 @@ class ReceiveBehaviour(CyclicBehaviour):
             content={
                 "type": "log_event",
                 "source": str(self.agent.jid),
-                "payload": {
-                    "event": "feed_dispensed",
-                    "hen_id": hen_id,
-                    "portion": int(portion),
-                    "remaining_feed": int(self.agent.feed_state.level),
-                    "hunger_before": int(hunger_before),
-                },
+                "payload": {"event": "feed_batch_dispensed", **payload},
             },
         )
         await self.send(msg_logger)
@@ -201,13 +339,15 @@ class ReceiveBehaviour(CyclicBehaviour):
             "type": "low_feed_warning",
             "source": str(self.agent.jid),
             "payload": {
+                "silo": str(self.agent.jid.bare),
                 "remaining_feed": int(self.agent.feed_state.level),
                 "threshold": int(self.agent.low_feed_threshold),
             },
         }
 
+        # alarm silosu trafia do sharda zachowania wybranego po JID silosu
         msg_alarm = build_message(
-            to=self.agent.behavior_alarm_jid,
+            to=self.agent.behavior_owner_of(str(self.agent.jid.bare)),
             performative="inform",
             conversation="alerts",
             content=payload,
@@ -220,6 +360,7 @@ class ReceiveBehaviour(CyclicBehaviour):
             "source": str(self.agent.jid),
             "payload": {
                 "hen_id": hen_id,
+                "silo": str(self.agent.jid.bare),
                 "hunger": int(hunger),
                 "remaining_feed": int(self.agent.feed_state.level)
                 if self.agent.feed_state
@@ -228,9 +369,29 @@ class ReceiveBehaviour(CyclicBehaviour):
         }
 
         msg_alarm = build_message(
-            to=self.agent.behavior_alarm_jid,
+            to=self.agent.behavior_owner_of(hen_id),
             performative="inform",
             conversation="alerts",
             content=payload,
         )
         await self.send(msg_alarm)
+
+    async def send_feed_restored(self, clears: list[str]):
+        # jawne zamknięcie alarmów silosu - same z siebie się nie powtarzają,
+        # więc cisza nie znaczy, że problem minął; no_feed leży u shardów
+        # właścicieli kur, dlatego wiadomość idzie do wszystkich
+        content = {
+            "type": "feed_restored",
+            "source": str(self.agent.jid),
+            "payload": {
+                "silo": str(self.agent.jid.bare),
+                "remaining_feed": int(self.agent.feed_state.level),
+                "clears": clears,
+            },
+        }
+        for to in self.agent.behavior_ring.nodes:
+            await self.send(
+                build_message(
+                    to=to, performative="inform", conversation="alerts", content=content
+                )
+            )
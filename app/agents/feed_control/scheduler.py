@@ -0,0 +1,155 @@
+import heapq
+import math
+
+
+class FeedingScheduler:
+    # Kolejka do karmienia: kopiec (max po głodzie) kur gotowych do karmienia
+    # oraz koło czasowe dla kur w trakcie cooldownu po karmieniu.
+    # Nieaktualne wpisy w kopcu nie są usuwane od razu - rozpoznaje je numer
+    # wersji (seq) kury, a kopiec jest co jakiś czas kompaktowany.
+    def __init__(
+        self, hunger_threshold: int, cooldown_s: float, wheel_slot_s: float = 0.5
+    ):
+        self.hunger_threshold = int(hunger_threshold)
+        self.cooldown_s = max(0.0, float(cooldown_s))
+        self.wheel_slot_s = max(0.001, float(wheel_slot_s))
+
+        self._hunger: dict[str, int] = {}
+        self._seq: dict[str, int] = {}
+
+        self._heap: list[tuple[int, int, str]] = []
+        self._queued: set[str] = set()
+
+        self._cool_until: dict[str, float] = {}
+        self._wheel: list[set[str]] = [
+            set()
+            for _ in range(int(math.ceil(self.cooldown_s / self.wheel_slot_s)) + 2)
+        ]
+        self._wheel_pos: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    @property
+    def cooling(self) -> int:
+        return len(self._cool_until)
+
+    def hunger_of(self, hen_id: str) -> int | None:
+        return self._hunger.get(hen_id)
+
+    def items(self):
+        return self._hunger.items()
+
+    def is_cooling(self, hen_id: str) -> bool:
+        return hen_id in self._cool_until
+
+    def fed_at(self, hen_id: str) -> float | None:
+        until = self._cool_until.get(hen_id)
+        return None if until is None else until - self.cooldown_s
+
+    def update(self, hen_id: str, hunger: int) -> None:
+        hunger = int(hunger)
+        prev = self._hunger.get(hen_id)
+        self._hunger[hen_id] = hunger
+
+        if hen_id in self._cool_until:
+            return
+        if hen_id in self._queued and prev == hunger:
+            return
+
+        self._enqueue(hen_id)
+
+    def remove(self, hen_id: str) -> None:
+        self._hunger.pop(hen_id, None)
+        self._queued.discard(hen_id)
+        self._seq[hen_id] = self._seq.get(hen_id, 0) + 1
+
+        until = self._cool_until.pop(hen_id, None)
+        if until is not None:
+            self._wheel[self._slot_for(until) % len(self._wheel)].discard(hen_id)
+
+    def pop_batch(self, k: int, now: float) -> list[tuple[str, int]]:
+        self.advance(now)
+
+        batch = []
+        while self._heap and len(batch) < k:
+            neg_hunger, seq, hen_id = heapq.heappop(self._heap)
+            if seq != self._seq.get(hen_id) or hen_id not in self._queued:
+                continue
+            self._queued.discard(hen_id)
+            batch.append((hen_id, -neg_hunger))
+        return batch
+
+    def requeue(self, hen_id: str) -> None:
+        if hen_id in self._hunger and hen_id not in self._cool_until:
+            self._enqueue(hen_id)
+
+    def mark_fed(self, hen_id: str, now: float) -> None:
+        self._queued.discard(hen_id)
+        self._seq[hen_id] = self._seq.get(hen_id, 0) + 1
+
+        if self.cooldown_s <= 0:
+            self.requeue(hen_id)
+            return
+
+        if self._wheel_pos is None:
+            self._wheel_pos = int(now // self.wheel_slot_s)
+
+        until = now + self.cooldown_s
+        self._cool_until[hen_id] = until
+        self._wheel[self._slot_for(until) % len(self._wheel)].add(hen_id)
+
+    def restore_fed(self, hen_id: str, fed_at: float, now: float) -> None:
+        # cooldown kury przejętej od innego sharda
+        if now - fed_at >= self.cooldown_s:
+            return
+        self.advance(now)
+        self.mark_fed(hen_id, fed_at)
+
+    def advance(self, now: float) -> None:
+        target = int(now // self.wheel_slot_s)
+        if self._wheel_pos is None:
+            self._wheel_pos = target
+            return
+
+        steps = min(target - self._wheel_pos, len(self._wheel))
+        first = target - steps + 1
+        self._wheel_pos = target
+
+        for pos in range(first, target + 1):
+            slot = self._wheel[pos % len(self._wheel)]
+            if not slot:
+                continue
+
+            for hen_id in list(slot):
+                until = self._cool_until.get(hen_id)
+                if until is not None and until > now:
+                    continue
+                slot.discard(hen_id)
+                self._cool_until.pop(hen_id, None)
+                self.requeue(hen_id)
+
+    def _slot_for(self, until: float) -> int:
+        return int(math.ceil(until / self.wheel_slot_s))
+
+    def _enqueue(self, hen_id: str) -> None:
+        seq = self._seq.get(hen_id, 0) + 1
+        self._seq[hen_id] = seq
+
+        hunger = self._hunger[hen_id]
+        if hunger < self.hunger_threshold:
+            self._queued.discard(hen_id)
+            return
+
+        self._queued.add(hen_id)
+        heapq.heappush(self._heap, (-hunger, seq, hen_id))
+
+        if len(self._heap) > 2 * len(self._queued) + 64:
+            self._compact()
+
+    def _compact(self) -> None:
+        self._heap = [
+            (-self._hunger[hen_id], self._seq[hen_id], hen_id)
+            for hen_id in self._queued
+        ]
+        heapq.heapify(self._heap)
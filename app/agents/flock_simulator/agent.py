@@ -0,0 +1,133 @@
+import asyncio
+
+import numpy as np
+
+from agents.base_agent import HenHouseAgent
+from agents.flock_simulator.behaviour import (
+    SimulateFlockBehaviour,
+    ReceiveFlockBehaviour,
+)
+from utils.config_loader import load_config, get_agent_credentials
+from utils.hashring import ConsistentHashRing
+from utils.messaging import NO_MESSAGES
+from utils.topology import behavior_ring, feed_ring, flock_hen_ids
+
+
+class FlockSimulatorAgent(HenHouseAgent):
+    def __init__(
+        self, jid: str, password: str, port: int = 5222, verify_security: bool = False
+    ):
+        super().__init__(jid, password, port, verify_security)
+
+        # właściciele (shardy karmienia i zachowania) kur, w kolejności hen_ids
+        self.feed_ring: ConsistentHashRing | None = None
+        self.feed_owners: list[str] = []
+        self.behavior_ring: ConsistentHashRing | None = None
+        self.behavior_owners: list[str] = []
+        self.ui_jid: str | None = None
+
+        self.hen_count: int = 100
+        self.tick_period_s: float = 5.0
+
+        # limit rozmiaru stanzy XMPP
+        self.batch_max_hens: int = 2000
+
+        self.hen_ids: list[str] = []
+        self.hen_index: dict[str, int] = {}
+
+        # stan stada - jeden wiersz na kurę
+        self.hunger: np.ndarray = np.zeros(0, dtype=np.int32)
+        self.aggression: np.ndarray = np.zeros(0, dtype=np.int32)
+        self.light_level: np.ndarray = np.zeros(0, dtype=np.int32)
+
+        self.rng: np.random.Generator = np.random.default_rng()
+
+        self.hunger_tick_min: int = 1
+        self.hunger_tick_max: int = 5
+        self.hunger_max: int = 100
+
+        self.aggression_min: int = -10
+        self.aggression_max: int = 10
+
+        self.hunger_high_threshold: int = 70
+        self.aggression_threshold: int = 7
+
+        self.initial_light_level: int = 50
+        self.neutral_light_level: int = 50
+        self.light_sensitivity: int = 10
+        self.max_light_effect_per_tick: int = 2
+
+    def refresh_owners(self) -> None:
+        self.feed_owners = [self.feed_ring.node_for(h) for h in self.hen_ids]
+        self.behavior_owners = [self.behavior_ring.node_for(h) for h in self.hen_ids]
+
+    def apply_shard_membership(self, role: str, shards: list[str]) -> None:
+        ring = self.feed_ring if role == "feeding" else self.behavior_ring
+        ring.set_nodes(shards)
+        self.refresh_owners()
+
+    async def setup(self):
+        cfg = load_config()
+        self.feed_ring = feed_ring(cfg)
+        self.behavior_ring = behavior_ring(cfg)
+        self.ui_jid = cfg["agents"]["ui"]["jid"]
+
+        sim_cfg = cfg.get("hen_simulator") or {}
+        flock_cfg = cfg.get("flock_simulator") or {}
+
+        self.tick_period_s = float(flock_cfg.get("tick_period_s", self.tick_period_s))
+        self.batch_max_hens = int(flock_cfg.get("batch_max_hens", self.batch_max_hens))
+        self.rng = np.random.default_rng(flock_cfg.get("seed"))
+
+        self.initial_light_level = int(
+            sim_cfg.get("initial_light_level", self.initial_light_level)
+        )
+        self.neutral_light_level = int(
+            sim_cfg.get("neutral_light_level", self.neutral_light_level)
+        )
+        self.light_sensitivity = int(
+            sim_cfg.get("light_sensitivity", self.light_sensitivity)
+        )
+        self.max_light_effect_per_tick = int(
+            sim_cfg.get("max_light_effect_per_tick", self.max_light_effect_per_tick)
+        )
+
+        self.hen_ids = flock_hen_ids(cfg, flock_jid=str(self.jid.bare))
+        self.hen_count = len(self.hen_ids)
+        self.refresh_owners()
+        self.hen_index = {hen_id: idx for idx, hen_id in enumerate(self.hen_ids)}
+
+        self.hunger = np.zeros(self.hen_count, dtype=np.int32)
+        self.aggression = np.zeros(self.hen_count, dtype=np.int32)
+        self.light_level = np.full(
+            self.hen_count, self.initial_light_level, dtype=np.int32
+        )
+
+        print(f"[FLOCK] Agent uruchomiony. Kury: {self.hen_count}")
+
+        self.add_behaviour(
+            SimulateFlockBehaviour(period=self.tick_period_s), NO_MESSAGES
+        )
+        self.add_behaviour(ReceiveFlockBehaviour())
+
+
+async def main():
+    cfg = load_config()
+    jid, password = get_agent_credentials("flock_simulator", cfg)
+
+    agent = FlockSimulatorAgent(
+        jid, password, verify_security=cfg["xmpp"]["verify_security"]
+    )
+    await agent.start(auto_register=False)
+    print("FlockSimulatorAgent jest online. CTRL+C aby zakończyć.")
+
+    try:
+        while True:
+            await asyncio.sleep(1)
+    except KeyboardInterrupt:
+        print("Zatrzymuję FlockSimulatorAgent...")
+        await agent.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+import numpy as np
+from spade.behaviour import PeriodicBehaviour, CyclicBehaviour
+
+from utils.messaging import parse_content, build_message, batch_entries
+from utils.readiness import wait_until_system_ready
+from utils.topology import parse_membership
+
+_AGGRESSION_NOISE = np.array([-1, 0, 0, 1], dtype=np.int32)
+
+
+def _compute_light_effect_on_aggression(
+    level: np.ndarray, neutral: int, sensitivity: int, max_effect: int
+) -> np.ndarray:
+    sens = max(1, int(sensitivity))
+
+    delta = int(neutral) - level
+    magnitude = np.maximum(np.abs(delta) // sens, 1)
+    effect = np.sign(delta) * magnitude
+
+    max_eff = int(max_effect)
+    return np.clip(effect, -max_eff, max_eff).astype(np.int32)
+
+
+class ReceiveFlockBehaviour(CyclicBehaviour):
+    async def run(self):
+        msg = await self.receive(timeout=1)
+        if not msg:
+            return
+
+        conv = msg.get_metadata("conversation")
+        data = parse_content(msg) or {}
+        msg_type = data.get("type")
+
+        if conv == "feeding" and msg_type == "feed_dispensed":
+            self.handle_feed_dispensed(data)
+
+        elif conv == "feeding" and msg_type == "feed_batch_dispensed":
+            for entry in batch_entries(data):
+                self.handle_feed_dispensed(entry)
+
+        elif conv == "membership":
+            membership = parse_membership(data)
+            if membership is not None:
+                self.agent.apply_shard_membership(*membership)
+
+        elif conv == "lighting" and msg_type in (
+            "light_level_update",
+            "light_state_update",
+        ):
+            self.handle_light_update(data.get("payload", {}) or {})
+
+        elif conv == "lighting" and msg_type == "light_batch_update":
+            for entry in batch_entries(data):
+                self.handle_light_update(entry)
+
+    def handle_feed_dispensed(self, data: dict):
+        idx = self.agent.hen_index.get(data.get("hen_id"))
+        if idx is None:
+            return
+
+        try:
+            amount = int(data.get("amount", 0))
+        except Exception:
+            amount = 0
+
+        if amount <= 0:
+            return
+
+        self.agent.hunger[idx] = max(0, int(self.agent.hunger[idx]) - amount)
+
+    def handle_light_update(self, payload: dict):
+        target_hen = payload.get("hen_id")
+        try:
+            level = int(payload.get("level"))
+        except Exception:
+            return
+
+        level = max(0, min(100, level))
+
+        if not target_hen:
+            self.agent.light_level[:] = level
+            return
+
+        idx = self.agent.hen_index.get(target_hen)
+        if idx is not None:
+            self.agent.light_level[idx] = level
+
+
+class SimulateFlockBehaviour(PeriodicBehaviour):
+    async def on_start(self):
+        await wait_until_system_ready()
+
+    def tick(self) -> None:
+        agent = self.agent
+        n = agent.hen_count
+        if n <= 0:
+            return
+
+        hunger_inc = agent.rng.integers(
+            agent.hunger_tick_min, agent.hunger_tick_max + 1, size=n, dtype=np.int32
+        )
+        hunger = np.clip(agent.hunger + hunger_inc, 0, agent.hunger_max)
+
+        hunger_pressure = np.where(hunger >= 70, 2, np.where(hunger >= 60, 1, 0))
+        noise = agent.rng.choice(_AGGRESSION_NOISE, size=n)
+
+        light_effect = _compute_light_effect_on_aggression(
+            agent.light_level,
+            agent.neutral_light_level,
+            agent.light_sensitivity,
+            agent.max_light_effect_per_tick,
+        )
+
+        aggr = agent.aggression + hunger_pressure + noise + light_effect
+        aggr = np.clip(aggr, agent.aggression_min, agent.aggression_max)
+
+        agent.hunger = hunger.astype(np.int32)
+        agent.aggression = aggr.astype(np.int32)
+
+    async def run(self):
+        self.tick()
+
+        agent = self.agent
+        print(
+            f"[FLOCK] Tick: kury={agent.hen_count}, "
+            f"hunger avg={float(agent.hunger.mean()):.1f} max={int(agent.hunger.max())}, "
+            f"aggr avg={float(agent.aggression.mean()):.1f} max={int(agent.aggression.max())}"
+        )
+
+        entries = [
+            {"hen_id": hen_id, "hunger": hunger, "aggression": aggr}
+            for hen_id, hunger, aggr in zip(
+                agent.hen_ids, agent.hunger.tolist(), agent.aggression.tolist()
+            )
+        ]
+
+        for owners, conversation in (
+            (agent.feed_owners, "feeding"),
+            (agent.behavior_owners, "behavior"),
+        ):
+            by_owner: dict[str, list[dict]] = {}
+            for entry, owner in zip(entries, owners):
+                by_owner.setdefault(owner, []).append(entry)
+
+            for owner, owned in by_owner.items():
+                await self.send_state_batch(owner, conversation, owned)
+
+        await self.send_state_batch(agent.ui_jid, "update_state", entries)
+
+    async def send_state_batch(self, to: str, conversation: str, entries: list[dict]):
+        agent = self.agent
+        chunk = max(1, int(agent.batch_max_hens))
+        for start in range(0, len(entries), chunk):
+            content = {
+                "type": "flock_state_batch",
+                "source": str(agent.jid),
+                "hunger_high_threshold": agent.hunger_high_threshold,
+                "aggression_threshold": agent.aggression_threshold,
+                "hens": entries[start : start + chunk],
+            }
+            await self.send(
+                build_message(
+                    to=to,
+                    performative="inform",
+                    conversation=conversation,
+                    content=content,
+                )
+            )
@@ -1,17 +1,20 @@
 import asyncio
 
-from spade.agent import Agent
-
+from agents.base_agent import HenHouseAgent
 from agents.hen_simulator.behaviour import (
     SimulateBehaviour,
     ReceiveFeedingBehaviour,
     ReceiveLightingBehaviour,
+    ReceiveMembershipBehaviour,
 )
 from models.hen_state import HenState
 from utils.config_loader import load_config, get_agent_credentials
+from utils.hashring import ConsistentHashRing
+from utils.messaging import NO_MESSAGES, conversation_template
+from utils.topology import behavior_ring, feed_ring
 
 
-class HenSimulatorAgent(Agent):
+class HenSimulatorAgent(HenHouseAgent):
     def __init__(
         self, jid: str, password: str, port: int = 5222, verify_security: bool = False
     ):
@@ -20,7 +23,9 @@ class HenSimulatorAgent(Agent):
         self.state: HenState | None = None
 
         self.feed_control_jid: str | None = None
+        self.feed_ring: ConsistentHashRing | None = None
         self.behavior_alarm_jid: str | None = None
+        self.behavior_ring: ConsistentHashRing | None = None
         self.ui_jid: str | None = None
 
         self.hen_id: str = str(jid)
@@ -33,7 +38,6 @@ class HenSimulatorAgent(Agent):
         self.aggression_max: int = 10
 
         self.hunger_high_threshold: int = 70
-        self.aggression_threshold: int = 7
 
         self.current_light_level: int = 50
 
@@ -43,6 +47,14 @@ class HenSimulatorAgent(Agent):
 
         self.max_light_effect_per_tick: int = 2
 
+    def apply_shard_membership(self, role: str, shards: list[str]) -> None:
+        if role == "feeding":
+            self.feed_ring.set_nodes(shards)
+            self.feed_control_jid = self.feed_ring.node_for(self.hen_id)
+        elif role == "behavior":
+            self.behavior_ring.set_nodes(shards)
+            self.behavior_alarm_jid = self.behavior_ring.node_for(self.hen_id)
+
     async def setup(self):
         print(f"[SIM:{self.hen_id}] Agent uruchomiony.")
         self.state = HenState()
@@ -51,8 +63,10 @@ class HenSimulatorAgent(Agent):
         self.state.aggression = 0
 
         cfg = load_config()
-        self.feed_control_jid = cfg["agents"]["feed_control"]["jid"]
-        self.behavior_alarm_jid = cfg["agents"]["behavior_alarm"]["jid"]
+        self.feed_ring = feed_ring(cfg)
+        self.feed_control_jid = self.feed_ring.node_for(self.hen_id)
+        self.behavior_ring = behavior_ring(cfg)
+        self.behavior_alarm_jid = self.behavior_ring.node_for(self.hen_id)
         self.ui_jid = cfg["agents"]["ui"]["jid"]
 
         sim_cfg = cfg.get("hen_simulator") or {}
@@ -70,9 +84,14 @@ class HenSimulatorAgent(Agent):
             sim_cfg.get("max_light_effect_per_tick", self.max_light_effect_per_tick)
         )
 
-        self.add_behaviour(SimulateBehaviour(period=5))
-        self.add_behaviour(ReceiveFeedingBehaviour())
-        self.add_behaviour(ReceiveLightingBehaviour())
+        self.add_behaviour(SimulateBehaviour(period=5), NO_MESSAGES)
+        self.add_behaviour(ReceiveFeedingBehaviour(), conversation_template("feeding"))
+        self.add_behaviour(
+            ReceiveLightingBehaviour(), conversation_template("lighting")
+        )
+        self.add_behaviour(
+            ReceiveMembershipBehaviour(), conversation_template("membership")
+        )
 
 
 async def main():
@@ -1,33 +1,16 @@
-import json
 import random
 
 from spade.behaviour import PeriodicBehaviour, CyclicBehaviour
 
-from utils.messaging import build_message
+from utils.messaging import build_message, parse_content, batch_entries
+from utils.readiness import wait_until_system_ready
+from utils.topology import parse_membership
 
 
 def _clamp(value: int, low: int, high: int) -> int:
     return max(low, min(high, value))
 
 
-def _safe_parse_body(body: str):
-    if body is None:
-        return None
-    if isinstance(body, dict):
-        return body
-    if not isinstance(body, str):
-        return None
-
-    body = body.strip()
-    if not body:
-        return None
-
-    try:
-        return json.loads(body)
-    except Exception:
-        return None
-
-
 class ReceiveFeedingBehaviour(CyclicBehaviour):
     async def run(self):
         msg = await self.receive(timeout=1)
@@ -38,11 +21,20 @@ class ReceiveFeedingBehaviour(CyclicBehaviour):
         if conv != "feeding":
             return
 
-        data = _safe_parse_body(msg.body)
+        data = parse_content(msg)
         if not isinstance(data, dict):
             return
 
-        if data.get("type") != "feed_dispensed":
+        msg_type = data.get("type")
+        if msg_type == "feed_batch_dispensed":
+            entry = next(
+                (e for e in batch_entries(data) if e["hen_id"] == self.agent.hen_id),
+                None,
+            )
+            if entry is None:
+                return
+            data = entry
+        elif msg_type != "feed_dispensed":
             return
 
         target_hen = data.get("hen_id")
@@ -76,15 +68,23 @@ class ReceiveLightingBehaviour(CyclicBehaviour):
         if conv != "lighting":
             return
 
-        data = _safe_parse_body(msg.body)
+        data = parse_content(msg)
         if not isinstance(data, dict):
             return
 
         msg_type = data.get("type")
-        if msg_type not in ("light_level_update", "light_state_update"):
+        if msg_type == "light_batch_update":
+            payload = next(
+                (e for e in batch_entries(data) if e["hen_id"] == self.agent.hen_id),
+                None,
+            )
+            if payload is None:
+                return
+        elif msg_type in ("light_level_update", "light_state_update"):
+            payload = data.get("payload", {}) or {}
+        else:
             return
 
-        payload = data.get("payload", {}) or {}
         target_hen = payload.get("hen_id")
 
         if target_hen and target_hen != self.agent.hen_id:
@@ -106,7 +106,28 @@ class ReceiveLightingBehaviour(CyclicBehaviour):
             )
 
 
+class ReceiveMembershipBehaviour(CyclicBehaviour):
+    async def run(self):
+        msg = await self.receive(timeout=1)
+        if not msg:
+            return
+
+        if (msg.metadata or {}).get("conversation") != "membership":
+            return
+
+        membership = parse_membership(parse_content(msg))
+        if membership is None:
+            return
+
+        role, shards = membership
+        self.agent.apply_shard_membership(role, shards)
+        print(f"[SIM:{self.agent.hen_id}] Shardy {role}: {shards}")
+
+
 class SimulateBehaviour(PeriodicBehaviour):
+    async def on_start(self):
+        await wait_until_system_ready()
+
     def _compute_light_effect_on_aggression(self) -> int:
         level = int(self.agent.current_light_level)
         neutral = int(self.agent.neutral_light_level)
@@ -195,21 +216,6 @@ class SimulateBehaviour(PeriodicBehaviour):
         )
         await self.send(msg_behavior)
 
-        if aggr >= self.agent.aggression_threshold:
-            msg_aggr = build_message(
-                to=self.agent.behavior_alarm_jid,
-                performative="inform",
-                conversation="behavior",
-                content={
-                    "type": "aggression_detected",
-                    "hen_id": self.agent.hen_id,
-                    "aggression": aggr,
-                    "threshold": self.agent.aggression_threshold,
-                    "hunger": hunger,
-                },
-            )
-            await self.send(msg_aggr)
-
         msg_ui = build_message(
             to=self.agent.ui_jid,
             performative="inform",
@@ -1,12 +1,11 @@
 import asyncio
 
-from spade.agent import Agent
-
+from agents.base_agent import HenHouseAgent
 from agents.lighting.lighting_agent_behaviour import LightningBehaviour
 from utils.config_loader import load_config, get_agent_credentials
 
 
-class LightingAgent(Agent):
+class LightingAgent(HenHouseAgent):
     def __init__(
         self, jid: str, password: str, port: int = 5222, verify_security: bool = False
     ):
@@ -15,7 +14,7 @@ class LightingAgent(Agent):
         self.logger_jid: str | None = None
         self.ui_jid: str | None = None
 
-        self.hen_count: int = 5
+        # tylko kury, dla których coś już ustawiono - reszta ma neutral_level
         self.hen_light_levels: dict[str, int] = {}
 
         self.neutral_level: int = 50
@@ -41,9 +40,6 @@ class LightingAgent(Agent):
         self.ui_jid = cfg["agents"]["ui"]["jid"]
         self.logger_jid = cfg["agents"]["logger"]["jid"]
 
-        sim_cfg = cfg.get("hen_simulator", {}) or {}
-        self.hen_count = int(sim_cfg.get("count", self.hen_count))
-
         light_cfg = cfg.get("lighting", {}) or {}
         self.neutral_level = int(light_cfg.get("neutral_level", self.neutral_level))
         self.min_level = int(light_cfg.get("min_level", self.min_level))
@@ -70,10 +66,6 @@ class LightingAgent(Agent):
             self.min_level, min(self.max_level, self.neutral_level)
         )
 
-        for i in range(1, self.hen_count + 1):
-            hen_id = f"simulator{i}@localhost"
-            self.hen_light_levels[hen_id] = int(self.neutral_level)
-
         self.add_behaviour(LightningBehaviour())
 
 
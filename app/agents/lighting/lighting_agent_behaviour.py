@@ -4,6 +4,8 @@ from spade.behaviour import CyclicBehaviour
 
 from utils.config_loader import load_config
 from utils.messaging import parse_content, build_message
+from utils.readiness import wait_until_system_ready
+from utils.topology import hen_ids
 
 
 def _clamp(v: int, lo: int, hi: int) -> int:
@@ -12,25 +14,16 @@ def _clamp(v: int, lo: int, hi: int) -> int:
 
 class LightningBehaviour(CyclicBehaviour):
     async def on_start(self):
-        cfg = load_config()
-        n = int(
-            (cfg.get("hen_simulator", {}) or {}).get(
-                "count", getattr(self.agent, "hen_count", 5)
-            )
-        )
+        await wait_until_system_ready()
+
         if not hasattr(self.agent, "hen_light_levels") or not isinstance(
             self.agent.hen_light_levels, dict
         ):
             self.agent.hen_light_levels = {}
 
-        for i in range(1, n + 1):
-            hen_id = f"simulator{i}@localhost"
-            if hen_id not in self.agent.hen_light_levels:
-                self.agent.hen_light_levels[hen_id] = int(
-                    getattr(self.agent, "neutral_level", 50)
-                )
-
-            await self._broadcast_light_update(reason="init", hen_id=hen_id)
+        await self._broadcast_light_updates(
+            reason="init", hen_ids=hen_ids(load_config())
+        )
 
     async def run(self):
         msg = await self.receive(timeout=10)
@@ -109,7 +102,7 @@ class LightningBehaviour(CyclicBehaviour):
             self.agent._last_sent_level = {}
 
         self.agent._last_set_at[hen_id] = time.monotonic()
-        await self._broadcast_light_update(reason=reason, hen_id=hen_id)
+        await self._broadcast_light_updates(reason=reason, hen_ids=[hen_id])
 
     async def _handle_manual_set(self, payload: dict):
         hen_id = payload.get("hen_id")
@@ -150,24 +143,30 @@ class LightningBehaviour(CyclicBehaviour):
             hen_id=hen_id, new_level=target, reason="regulate_to_target"
         )
 
-    async def _broadcast_light_update(self, reason: str, hen_id: str):
-        if not hen_id:
+    async def _broadcast_light_updates(self, reason: str, hen_ids: list[str]):
+        neutral = getattr(self.agent, "neutral_level", 50)
+        hens = [
+            {
+                "hen_id": hen_id,
+                "level": int(self.agent.hen_light_levels.get(hen_id, neutral)),
+                "reason": reason,
+            }
+            for hen_id in hen_ids
+            if hen_id
+        ]
+        if not hens:
             return
 
-        level = int(
-            self.agent.hen_light_levels.get(
-                hen_id, getattr(self.agent, "neutral_level", 50)
-            )
-        )
+        payload = {"reason": reason, "hens": hens}
 
         msg_ui = build_message(
             to=self.agent.ui_jid,
             performative="inform",
             conversation="update_state",
             content={
-                "type": "light_state_update",
+                "type": "light_batch_update",
                 "source": str(self.agent.jid),
-                "payload": {"level": level, "reason": reason, "hen_id": hen_id},
+                "payload": payload,
             },
         )
         await self.send(msg_ui)
@@ -179,30 +178,33 @@ class LightningBehaviour(CyclicBehaviour):
             content={
                 "type": "log_event",
                 "source": str(self.agent.jid),
-                "payload": {
-                    "event": "light_change",
-                    "level": level,
-                    "reason": reason,
-                    "hen_id": hen_id,
-                },
+                "payload": {"event": "light_batch_update", **payload},
             },
         )
         await self.send(msg_log)
 
-        msg_hen = build_message(
-            to=hen_id,
-            performative="inform",
-            conversation="lighting",
-            content={
-                "type": "light_level_update",
-                "source": str(self.agent.jid),
-                "payload": {"level": level, "reason": reason, "hen_id": hen_id},
-            },
-        )
-        await self.send(msg_hen)
+        # jedna wiadomość na konto XMPP - stado (flock) dostaje całą swoją listę
+        by_jid: dict[str, list[dict]] = {}
+        for entry in hens:
+            bare = entry["hen_id"].split("/", 1)[0]
+            by_jid.setdefault(bare, []).append(entry)
+
+        for bare, entries in by_jid.items():
+            msg_hen = build_message(
+                to=bare,
+                performative="inform",
+                conversation="lighting",
+                content={
+                    "type": "light_batch_update",
+                    "source": str(self.agent.jid),
+                    "hens": entries,
+                },
+            )
+            await self.send(msg_hen)
 
         if not hasattr(self.agent, "_last_sent_level") or not isinstance(
             self.agent._last_sent_level, dict
         ):
             self.agent._last_sent_level = {}
-        self.agent._last_sent_level[hen_id] = level
+        for entry in hens:
+            self.agent._last_sent_level[entry["hen_id"]] = entry["level"]
@@ -1,11 +1,41 @@
-from spade.agent import Agent
-
+from agents.base_agent import HenHouseAgent
 from agents.logger.logger_agent_behaviour import ReceiveBehaviour
+from repositories.event_index import EventIndex
 from repositories.event_repository import EventRepository
+from repositories.event_segments import SegmentPolicy
 from utils.config_loader import load_config
 
 
-class LoggerAgent(Agent):
+def _segment_policy(log_cfg: dict) -> SegmentPolicy | None:
+    seg_cfg = log_cfg.get("segments") or {}
+    if not seg_cfg.get("enabled", False):
+        return None
+
+    max_age_days = seg_cfg.get("retention_max_age_days")
+    return SegmentPolicy(
+        max_segment_bytes=seg_cfg.get("max_segment_bytes"),
+        max_segment_age_s=seg_cfg.get("max_segment_age_s"),
+        compress=bool(seg_cfg.get("compress", True)),
+        retention_max_bytes=seg_cfg.get("retention_max_bytes"),
+        retention_max_age_s=(
+            float(max_age_days) * 86400 if max_age_days is not None else None
+        ),
+    )
+
+
+def _event_index(log_cfg: dict) -> EventIndex | None:
+    index_cfg = log_cfg.get("index") or {}
+    if not index_cfg.get("enabled", False):
+        return None
+
+    max_age_days = index_cfg.get("retention_max_age_days")
+    return EventIndex(
+        index_cfg.get("file", "logs/events.sqlite3"),
+        max_age_s=float(max_age_days) * 86400 if max_age_days is not None else None,
+    )
+
+
+class LoggerAgent(HenHouseAgent):
     def __init__(
         self, jid: str, password: str, port: int = 5222, verify_security: bool = False
     ):
@@ -16,7 +46,19 @@ class LoggerAgent(Agent):
         print("[LOGGER] Agent uruchomiony.")
         cfg = load_config()
 
-        events_file = cfg["logging"]["events_file"]
-        self.repo = EventRepository(events_file)
+        log_cfg = cfg["logging"]
+        self.repo = EventRepository(
+            log_cfg["events_file"],
+            durability=log_cfg.get("durability", "always"),
+            fsync_every_n=int(log_cfg.get("fsync_every_n", 100)),
+            fsync_interval_ms=float(log_cfg.get("fsync_interval_ms", 200)),
+            segment_policy=_segment_policy(log_cfg),
+            index=_event_index(log_cfg),
+        )
 
         self.add_behaviour(ReceiveBehaviour())
+
+    async def stop(self):
+        await super().stop()
+        if self.repo:
+            await self.repo.close_async()
@@ -38,7 +38,7 @@ class ReceiveBehaviour(CyclicBehaviour):
             "data": payload,
         }
 
-        self.agent.repo.log(event_type, log_record)
+        await self.agent.repo.log_async(event_type, log_record)
         print(f"[LOGGER] {event_type}: {log_record}")
 
     def _normalize_event(
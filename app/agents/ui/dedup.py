@@ -0,0 +1,35 @@
+from collections import OrderedDict
+
+
+class DedupCache:
+    # Okno deduplikacji zdarzeń UI. Klucze trzymane w kolejności ostatniego
+    # zapisu, więc najstarsze są zawsze na początku: wygasłe wpisy zdejmujemy
+    # z przodu przy każdym sprawdzeniu, a max_entries ogranicza pamięć, gdy
+    # w jednym oknie pojawi się bardzo dużo różnych kluczy.
+    def __init__(self, window_s: float, max_entries: int = 4096):
+        self.window_s = max(0.0, float(window_s))
+        self.max_entries = max(1, int(max_entries))
+        self._seen: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def seen(self, key: str, now: float) -> bool:
+        self._expire(now)
+
+        last = self._seen.get(key)
+        if last is not None and (now - last) < self.window_s:
+            return True
+
+        self._seen[key] = now
+        self._seen.move_to_end(key)
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return False
+
+    def _expire(self, now: float) -> None:
+        seen = self._seen
+        while seen:
+            if now - next(iter(seen.values())) < self.window_s:
+                break
+            seen.popitem(last=False)
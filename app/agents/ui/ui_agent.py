@@ -1,20 +1,22 @@
-from spade.agent import Agent
-
+from agents.base_agent import HenHouseAgent
 from agents.ui.ui_agent_behaviour import ReceiveBehaviour
 from agents.ui.ui_ws import UiWebSocketHub, start_ws_server
 
 
-class UIAgent(Agent):
+class UIAgent(HenHouseAgent):
     async def setup(self):
         print("[UI] Agent uruchomiony.")
 
         self.hens: dict[str, dict] = {}
         self.feed: dict = {}
+        # stan każdego silosu (shard karmienia); `feed` to suma
+        self.feeds_by_silo: dict[str, dict] = {}
         self.lights_by_hen: dict[str, dict] = {}
         self.last_events: list[dict] = []
 
+        self.light: dict = {}
+
         hub = UiWebSocketHub()
-        await start_ws_server(hub, host="0.0.0.0", port=8765)
         recv_beh = ReceiveBehaviour(
             ws_hub=hub,
             render_interval_sec=0.5,
@@ -22,3 +24,6 @@ class UIAgent(Agent):
             also_print_console=False,
         )
         self.add_behaviour(recv_beh)
+        # provider przed startem serwera - pierwszy klient dostaje snapshot
+        hub.snapshot_provider = recv_beh._make_snapshot
+        await start_ws_server(hub, host="0.0.0.0", port=8765)
@@ -1,3 +1,4 @@
+import hashlib
 import os
 import time
 from datetime import datetime, timezone
@@ -5,7 +6,9 @@ from typing import Any, Dict, Optional
 
 from spade.behaviour import CyclicBehaviour
 
-from utils.messaging import parse_content
+from agents.ui.dedup import DedupCache
+from agents.ui.ui_ws import KEYED_SECTIONS
+from utils.messaging import parse_content, batch_entries
 
 
 def _utc_now_iso() -> str:
@@ -20,6 +23,15 @@ def _clear_console():
     os.system("cls" if os.name == "nt" else "clear")
 
 
+def _same_state(old, new) -> bool:
+    # świeży last_update sam w sobie nie jest zmianą stanu
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return old == new
+    return {k: v for k, v in old.items() if k != "last_update"} == {
+        k: v for k, v in new.items() if k != "last_update"
+    }
+
+
 def _stable_hash(obj) -> str:
     try:
         if obj is None:
@@ -36,12 +48,51 @@ def _stable_hash(obj) -> str:
         return "err"
 
 
+# Pola, które odróżniają zdarzenia danego typu, klucz (typ, payload["event"]);
+# None jako event = dowolny. Pozostałe typy idą przez _stable_hash.
+# Alarmy z agregatora (mają alarm_state) nie przechodzą przez dedup w ogóle -
+# agregator sam je scala i limituje, a ponowne otwarcie nie może zniknąć.
+_FINGERPRINT_FIELDS: dict[tuple[str, str | None], tuple[str, ...]] = {
+    ("critical_event", "flock_anomaly"): ("hens", "outlier_count", "outlier_ids"),
+    ("legacy:hen_state", None): ("hunger", "aggression"),
+    ("legacy:feed_dispensed", None): ("remaining_feed", "portion", "hunger_before"),
+    ("legacy:light_change", None): ("level", "hen_id", "reason"),
+}
+
+# pola wyliczane z payloadu zamiast czytane wprost
+_DERIVED_FIELDS = {
+    "outlier_ids": lambda p: tuple(o.get("hen_id") for o in p.get("outliers") or ()),
+}
+
+
+def _field(payload: dict, name: str):
+    derive = _DERIVED_FIELDS.get(name)
+    return derive(payload) if derive is not None else payload.get(name)
+
+
+def _fingerprint(kind: str, payload) -> str:
+    fields = None
+    if isinstance(payload, dict):
+        fields = _FINGERPRINT_FIELDS.get(
+            (kind, payload.get("event"))
+        ) or _FINGERPRINT_FIELDS.get((kind, None))
+
+    if fields is None:
+        raw = _stable_hash(payload)
+    else:
+        raw = repr(tuple(_field(payload, f) for f in fields))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
 class ReceiveBehaviour(CyclicBehaviour):
     _WS_EVENT_BLOCKLIST = {
         "hen_state_update",
+        "flock_state_batch",
         "light_state_update",
+        "light_batch_update",
         "feed_state_update",
         "feed_dispensed",
+        "feed_batch_dispensed",
     }
 
     def __init__(
@@ -52,6 +103,7 @@ class ReceiveBehaviour(CyclicBehaviour):
         clear_screen: bool = False,
         also_print_console: bool = False,
         dedup_window_sec: float = 0.0,
+        dedup_max_entries: int = 4096,
     ):
         super().__init__()
         self.ws_hub = ws_hub
@@ -63,13 +115,22 @@ class ReceiveBehaviour(CyclicBehaviour):
         self.also_print_console = bool(also_print_console)
 
         self._dedup_window_sec = float(dedup_window_sec)
-        self._dedup: dict[str, float] = {}
+        self._dedup = DedupCache(self._dedup_window_sec, max_entries=dedup_max_entries)
+
+        # Snapshoty wersjonowane: między renderami zbieramy zmienione klucze
+        # i wysyłamy tylko je jako łatkę version/base_version. Pełny stan
+        # dostaje klient przy połączeniu albo gdy poprosi o resync.
+        self._version = 0
+        self._dirty_keys: dict[str, set[str]] = {s: set() for s in KEYED_SECTIONS}
+        self._dirty_sections: set[str] = set()
 
     async def run(self):
         if not hasattr(self.agent, "hens"):
             self.agent.hens = {}
         if not hasattr(self.agent, "feed"):
             self.agent.feed = {}
+        if not hasattr(self.agent, "feeds_by_silo"):
+            self.agent.feeds_by_silo = {}
         if not hasattr(self.agent, "light"):
             self.agent.light = {}
         if not hasattr(self.agent, "lights_by_hen"):
@@ -106,7 +167,7 @@ class ReceiveBehaviour(CyclicBehaviour):
                     sender=sender,
                     event_type=f"conv:{conv}",
                     payload=data,
-                    dedup_key=f"conv:{conv}:{sender}:{_stable_hash(data)}",
+                    fingerprint=True,
                 )
 
             if changed:
@@ -123,17 +184,22 @@ class ReceiveBehaviour(CyclicBehaviour):
         event_type: str,
         payload: dict | Any,
         dedup_key: Optional[str] = None,
+        fingerprint: bool = False,
         ts: Optional[str] = None,
     ) -> None:
         if not self.ws_hub:
             return
 
-        if dedup_key and self._dedup_window_sec > 0:
-            now = _now_monotonic()
-            last = self._dedup.get(dedup_key)
-            if last is not None and (now - last) < self._dedup_window_sec:
-                return
-            self._dedup[dedup_key] = now
+        # odcisk liczony dopiero tutaj - bez huba i bez okna dedup nie hashujemy
+        if fingerprint and dedup_key is None and self._dedup_window_sec > 0:
+            dedup_key = f"{event_type}:{sender}:{_fingerprint(event_type, payload)}"
+
+        if (
+            dedup_key
+            and self._dedup_window_sec > 0
+            and self._dedup.seen(dedup_key, _now_monotonic())
+        ):
+            return
 
         event = {
             "ts": ts or _utc_now_iso(),
@@ -143,7 +209,7 @@ class ReceiveBehaviour(CyclicBehaviour):
         }
 
         try:
-            await self.ws_hub.broadcast(
+            self.ws_hub.broadcast(
                 {
                     "type": "ui_event",
                     "ts": _utc_now_iso(),
@@ -157,19 +223,46 @@ class ReceiveBehaviour(CyclicBehaviour):
         return {
             "type": "ui_snapshot",
             "ts": _utc_now_iso(),
+            "version": self._version,
             "state": {
                 "feed": self.agent.feed or {},
+                "feeds_by_silo": getattr(self.agent, "feeds_by_silo", {}) or {},
                 "light": self.agent.light or {},
                 "lights_by_hen": getattr(self.agent, "lights_by_hen", {}) or {},
                 "hens": self.agent.hens or {},
             },
         }
 
+    def _make_delta(self) -> Dict[str, Any] | None:
+        changes: dict[str, dict] = {}
+        for section, keys in self._dirty_keys.items():
+            if not keys:
+                continue
+            state = getattr(self.agent, section, {}) or {}
+            changes[section] = {k: state[k] for k in keys if k in state}
+            keys.clear()
+        for section in self._dirty_sections:
+            changes[section] = getattr(self.agent, section, {}) or {}
+        self._dirty_sections.clear()
+
+        if not changes:
+            return None
+
+        self._version += 1
+        return {
+            "type": "ui_snapshot_delta",
+            "ts": _utc_now_iso(),
+            "version": self._version,
+            "base_version": self._version - 1,
+            "changes": changes,
+        }
+
     async def _broadcast_snapshot(self) -> None:
-        if not self.ws_hub:
+        delta = self._make_delta()
+        if not self.ws_hub or delta is None:
             return
         try:
-            await self.ws_hub.broadcast(self._make_snapshot())
+            self.ws_hub.broadcast(delta)
         except Exception:
             return
 
@@ -212,12 +305,30 @@ class ReceiveBehaviour(CyclicBehaviour):
 
         if event == "feed_dispensed":
             return await self.handle_update_state(
-                sender, {"type": "feed_dispensed", "payload": payload}
+                sender,
+                {
+                    "type": "feed_dispensed",
+                    "source": data.get("source"),
+                    "payload": payload,
+                },
+            )
+        if event == "feed_batch_dispensed":
+            return await self.handle_update_state(
+                sender,
+                {
+                    "type": "feed_batch_dispensed",
+                    "source": data.get("source"),
+                    "payload": payload,
+                },
             )
         if event == "light_change":
             return await self.handle_update_state(
                 sender, {"type": "light_state_update", "payload": payload}
             )
+        if event == "light_batch_update":
+            return await self.handle_update_state(
+                sender, {"type": "light_batch_update", "payload": payload}
+            )
         if event in ("aggression_alert", "critical_event"):
             return await self.handle_update_state(
                 sender, {"type": "critical_event", "payload": payload}
@@ -241,24 +352,33 @@ class ReceiveBehaviour(CyclicBehaviour):
                 "aggression": int(payload.get("aggression", 0) or 0),
                 "last_update": _utc_now_iso(),
             }
-            old = self.agent.hens.get(hen_id)
-            self.agent.hens[hen_id] = new_state
-            changed = old != new_state
+            changed = self._put("hens", hen_id, new_state)
+
+        elif msg_type == "flock_state_batch":
+            now_iso = _utc_now_iso()
+            for entry in batch_entries(data):
+                new_state = {
+                    "hunger": int(entry.get("hunger", 0) or 0),
+                    "aggression": int(entry.get("aggression", 0) or 0),
+                    "last_update": now_iso,
+                }
+                changed = self._put("hens", entry["hen_id"], new_state) or changed
 
         elif msg_type == "feed_state_update":
+            silo = data.get("source") or sender
             new_feed = {
-                **(self.agent.feed or {}),
+                **self.agent.feeds_by_silo.get(silo, {}),
                 "capacity": payload.get("capacity"),
                 "remaining_feed": payload.get("remaining_feed"),
                 "last_action": "state_update",
                 "last_update": _utc_now_iso(),
             }
-            changed = new_feed != (self.agent.feed or {})
-            self.agent.feed = new_feed
+            changed = self._set_silo_feed(silo, new_feed)
 
         elif msg_type == "feed_dispensed":
+            silo = data.get("source") or sender
             new_feed = {
-                **(self.agent.feed or {}),
+                **self.agent.feeds_by_silo.get(silo, {}),
                 "capacity": payload.get("capacity"),
                 "remaining_feed": payload.get("remaining_feed"),
                 "last_action": "feed_dispensed",
@@ -267,9 +387,25 @@ class ReceiveBehaviour(CyclicBehaviour):
                 "portion": payload.get("portion"),
                 "hunger_before": payload.get("hunger_before"),
             }
-            feed_changed = new_feed != (self.agent.feed or {})
-            self.agent.feed = new_feed
-            changed = feed_changed
+            changed = self._set_silo_feed(silo, new_feed)
+
+        elif msg_type == "feed_batch_dispensed":
+            silo = data.get("source") or sender
+            hens = batch_entries(payload)
+            last = hens[-1] if hens else {}
+            new_feed = {
+                **self.agent.feeds_by_silo.get(silo, {}),
+                "capacity": payload.get("capacity"),
+                "remaining_feed": payload.get("remaining_feed"),
+                "last_action": "feed_batch_dispensed",
+                "last_update": _utc_now_iso(),
+                "hen_id": last.get("hen_id"),
+                "portion": last.get("portion"),
+                "hunger_before": last.get("hunger_before"),
+                "fed_hens": len(hens),
+                "total_portion": payload.get("total_portion"),
+            }
+            changed = self._set_silo_feed(silo, new_feed)
 
         elif msg_type == "light_state_update":
             level = payload.get("level")
@@ -282,18 +418,27 @@ class ReceiveBehaviour(CyclicBehaviour):
             }
 
             if not hen_id:
-                old = self.agent.light if isinstance(self.agent.light, dict) else {}
-                self.agent.light = entry
-                changed = old != entry
+                changed = self._set_section("light", entry)
             else:
                 if (
                     not hasattr(self.agent, "lights_by_hen")
                     or self.agent.lights_by_hen is None
                 ):
                     self.agent.lights_by_hen = {}
-                old = self.agent.lights_by_hen.get(hen_id)
-                self.agent.lights_by_hen[hen_id] = entry
-                changed = old != entry
+                changed = self._put("lights_by_hen", hen_id, entry)
+
+        elif msg_type == "light_batch_update":
+            if self.agent.lights_by_hen is None:
+                self.agent.lights_by_hen = {}
+            now_iso = _utc_now_iso()
+            for e in batch_entries(payload):
+                entry = {
+                    "level": e.get("level"),
+                    "reason": e.get("reason", payload.get("reason")),
+                    "hen_id": e["hen_id"],
+                    "last_update": now_iso,
+                }
+                changed = self._put("lights_by_hen", e["hen_id"], entry) or changed
 
         elif msg_type == "critical_event":
             changed = False
@@ -303,11 +448,42 @@ class ReceiveBehaviour(CyclicBehaviour):
                 sender=sender,
                 event_type=msg_type or "unknown_update",
                 payload=payload or data,
-                dedup_key=f"update:{msg_type}:{sender}:{_stable_hash(payload or data)}",
+                fingerprint="alarm_state" not in payload,
             )
 
         return changed
 
+    def _put(self, section: str, key: str, value: dict) -> bool:
+        state = getattr(self.agent, section)
+        same = _same_state(state.get(key), value)
+        state[key] = value
+        if same:
+            return False
+        self._dirty_keys[section].add(key)
+        return True
+
+    def _set_section(self, section: str, value: dict) -> bool:
+        old = getattr(self.agent, section, None)
+        setattr(self.agent, section, value)
+        if _same_state(old, value):
+            return False
+        self._dirty_sections.add(section)
+        return True
+
+    def _set_silo_feed(self, silo: str, new_feed: dict) -> bool:
+        silos = self.agent.feeds_by_silo
+        silo_changed = self._put("feeds_by_silo", silo, new_feed)
+
+        total = dict(new_feed)
+        if len(silos) > 1:
+            total["capacity"] = sum(int(f.get("capacity") or 0) for f in silos.values())
+            total["remaining_feed"] = sum(
+                int(f.get("remaining_feed") or 0) for f in silos.values()
+            )
+            total["silos"] = len(silos)
+
+        return self._set_section("feed", total) or silo_changed
+
     async def handle_legacy_ui_update(self, sender: str, data: dict) -> bool:
         if not isinstance(data, dict):
             return False
@@ -324,9 +500,7 @@ class ReceiveBehaviour(CyclicBehaviour):
                 "aggression": int(payload.get("aggression", 0) or 0),
                 "last_update": _utc_now_iso(),
             }
-            old = self.agent.hens.get(hen_id)
-            self.agent.hens[hen_id] = new_state
-            changed = old != new_state
+            changed = self._put("hens", hen_id, new_state)
 
         elif event_type == "feed_dispensed":
             new_feed = {
@@ -338,8 +512,7 @@ class ReceiveBehaviour(CyclicBehaviour):
                 "portion": payload.get("portion"),
                 "hunger_before": payload.get("hunger_before"),
             }
-            changed = new_feed != (self.agent.feed or {})
-            self.agent.feed = new_feed
+            changed = self._set_section("feed", new_feed)
 
         elif event_type == "light_change":
             new_light = {
@@ -348,15 +521,13 @@ class ReceiveBehaviour(CyclicBehaviour):
                 "reason": payload.get("reason"),
                 "last_update": _utc_now_iso(),
             }
-            old = self.agent.light if isinstance(self.agent.light, dict) else {}
-            self.agent.light = new_light
-            changed = old != new_light
+            changed = self._set_section("light", new_light)
 
         await self._emit_event(
             sender=sender,
             event_type=f"legacy:{event_type}",
             payload=payload or data,
-            dedup_key=f"legacy:{event_type}:{sender}:{_stable_hash(payload or data)}",
+            fingerprint=True,
         )
 
         return changed
@@ -1,66 +1,247 @@
 import asyncio
 import json
 import logging
-from typing import Any, Dict, Set
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
 
 import websockets
 
 log = logging.getLogger(__name__)
 
+# sekcje stanu słownikowe po kluczu (kura / silos) - łatka niesie tylko
+# zmienione wpisy; pozostałe sekcje (feed, light) idą w całości
+KEYED_SECTIONS = ("hens", "lights_by_hen", "feeds_by_silo")
+
+
+# sekcje, które da się zawęzić do wybranych kur
+HEN_SECTIONS = ("hens", "lights_by_hen")
+
+
+def _client_message(raw) -> dict:
+    try:
+        data = json.loads(raw)
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _optional_set(value) -> frozenset[str] | None:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    return frozenset(str(v) for v in value)
+
+
+@dataclass(frozen=True)
+class Subscription:
+    # None = bez filtra
+    hen_ids: frozenset[str] | None = None
+    event_types: frozenset[str] | None = None
+    min_snapshot_interval_s: float = 0.0
+
+    @property
+    def filters_hens(self) -> bool:
+        return self.hen_ids is not None
+
+    def wants_event(self, event: dict) -> bool:
+        if self.event_types is not None and event.get("type") not in self.event_types:
+            return False
+        if self.hen_ids is not None:
+            payload = event.get("payload")
+            hen_id = payload.get("hen_id") if isinstance(payload, dict) else None
+            if hen_id is not None and hen_id not in self.hen_ids:
+                return False
+        return True
+
+    def filter_state(self, state: dict) -> dict:
+        # działa i dla pełnego stanu, i dla `changes` z łatki
+        if self.hen_ids is None:
+            return state
+        out = dict(state)
+        for section in HEN_SECTIONS:
+            entries = state.get(section)
+            if not entries:
+                continue
+            if len(self.hen_ids) < len(entries):
+                out[section] = {h: entries[h] for h in self.hen_ids if h in entries}
+            else:
+                out[section] = {h: v for h, v in entries.items() if h in self.hen_ids}
+        return out
+
+
+def parse_subscription(data: dict) -> Subscription:
+    # {"type": "subscribe", "hen_ids": [...], "event_types": [...],
+    #  "max_snapshot_rate_hz": 2}
+    rate = data.get("max_snapshot_rate_hz")
+    try:
+        interval = 1.0 / float(rate) if rate and float(rate) > 0 else 0.0
+    except (TypeError, ValueError):
+        interval = 0.0
+    return Subscription(
+        hen_ids=_optional_set(data.get("hen_ids")),
+        event_types=_optional_set(data.get("event_types")),
+        min_snapshot_interval_s=interval,
+    )
+
+
+def _merge_deltas(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    # base_version zostaje ze starszej łatki, reszta z nowszej
+    changes = dict(old.get("changes") or {})
+    for section, value in (new.get("changes") or {}).items():
+        if section in KEYED_SECTIONS:
+            changes[section] = {**(changes.get(section) or {}), **value}
+        else:
+            changes[section] = value
+    return {**new, "base_version": old.get("base_version"), "changes": changes}
+
+
+class _ClientQueue:
+    # Kolejka jednego klienta: co najwyżej jedna oczekująca łatka stanu
+    # (kolejne są scalane - wygrywa najnowszy stan) i ograniczona kolejka
+    # zdarzeń, z której przy przepełnieniu wypadają najstarsze.
+    def __init__(self, max_events: int):
+        self.subscription = Subscription()
+        self.last_state_at = 0.0
+
+        self.full_snapshot = False
+        self.delta: Dict[str, Any] | None = None
+        self.delta_msg: str | None = None
+        self.events: deque[str] = deque(maxlen=max(1, int(max_events)))
+        self.dropped_events = 0
+        self.wakeup = asyncio.Event()
+
+    def put_delta(self, delta: Dict[str, Any], msg: str | None) -> None:
+        if self.delta is None:
+            self.delta, self.delta_msg = delta, msg
+        else:
+            self.delta, self.delta_msg = _merge_deltas(self.delta, delta), None
+        self.wakeup.set()
+
+    def put_event(self, msg: str) -> None:
+        if len(self.events) == self.events.maxlen:
+            self.dropped_events += 1
+        self.events.append(msg)
+        self.wakeup.set()
+
+    def request_snapshot(self) -> None:
+        self.full_snapshot = True
+        self.wakeup.set()
+
+    def state_delay(self, now: float) -> float | None:
+        # ile jeszcze wstrzymać łatkę, żeby nie przekroczyć max_snapshot_rate_hz
+        if self.delta is None or self.full_snapshot:
+            return None
+        due = self.last_state_at + self.subscription.min_snapshot_interval_s
+        return max(0.0, due - now)
+
 
 class UiWebSocketHub:
     def __init__(
         self,
         send_timeout_sec: float = 1.5,
         max_queue: int = 32,
+        max_pending_events: int = 64,
     ):
-        self.clients: Set = set()
-        self._lock = asyncio.Lock()
+        self.clients: Dict[Any, _ClientQueue] = {}
         self.send_timeout_sec = float(send_timeout_sec)
         self.max_queue = int(max_queue)
+        self.max_pending_events = int(max_pending_events)
+        # pełny stan z aktualną wersją - wysyłany przy połączeniu i na resync
+        self.snapshot_provider: Optional[Callable[[], Dict[str, Any]]] = None
 
     async def handler(self, ws, *args, **kwargs):
-        async with self._lock:
-            self.clients.add(ws)
+        queue = _ClientQueue(self.max_pending_events)
+        self.clients[ws] = queue
+        queue.request_snapshot()
+        writer = asyncio.create_task(self._writer(ws, queue))
 
         try:
-            async for _ in ws:
-                pass
+            async for raw in ws:
+                data = _client_message(raw)
+                if data.get("type") == "subscribe":
+                    queue.subscription = parse_subscription(data)
+                    # dotychczasowy stan klienta nie pasuje do nowego filtra
+                    queue.request_snapshot()
+                elif data.get("type") == "resync":
+                    queue.request_snapshot()
         except Exception as e:
             log.debug("WS client disconnected: %r", e)
         finally:
-            async with self._lock:
-                self.clients.discard(ws)
-
-    async def broadcast(self, payload: Dict[str, Any]) -> None:
-        msg = json.dumps(payload, ensure_ascii=False)
+            self.clients.pop(ws, None)
+            writer.cancel()
 
-        async with self._lock:
-            clients_snapshot = list(self.clients)
-
-        if not clients_snapshot:
-            return
+    async def _writer(self, ws, queue: _ClientQueue) -> None:
+        # jedyne miejsce, które pisze do tego klienta; wolny klient spowalnia
+        # tylko siebie, a po przekroczeniu send_timeout_sec jest rozłączany
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(
+                        queue.wakeup.wait(), timeout=queue.state_delay(time.monotonic())
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                queue.wakeup.clear()
 
-        async def _safe_send(ws):
+                for msg in self._drain(queue):
+                    await asyncio.wait_for(ws.send(msg), timeout=self.send_timeout_sec)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.debug("WS writer stopped: %r", e)
+            self.clients.pop(ws, None)
             try:
-                await asyncio.wait_for(
-                    ws.send(msg),
-                    timeout=self.send_timeout_sec,
-                )
-                return True
+                await ws.close()
             except Exception:
-                return False
+                pass
+
+    def _drain(self, queue: _ClientQueue):
+        if queue.full_snapshot:
+            queue.full_snapshot = False
+            # pełny stan zawiera już wszystko, co niosła oczekująca łatka
+            queue.delta = queue.delta_msg = None
+            queue.last_state_at = time.monotonic()
+            if self.snapshot_provider is not None:
+                snapshot = self.snapshot_provider()
+                if queue.subscription.filters_hens:
+                    snapshot = {
+                        **snapshot,
+                        "state": queue.subscription.filter_state(snapshot["state"]),
+                    }
+                yield json.dumps(snapshot, ensure_ascii=False)
 
-        results = await asyncio.gather(
-            *(_safe_send(ws) for ws in clients_snapshot),
-            return_exceptions=False,
-        )
+        if queue.delta is not None and not queue.state_delay(time.monotonic()):
+            msg = queue.delta_msg or json.dumps(queue.delta, ensure_ascii=False)
+            queue.delta = queue.delta_msg = None
+            queue.last_state_at = time.monotonic()
+            yield msg
 
-        dead = [ws for ws, ok in zip(clients_snapshot, results) if not ok]
-        if dead:
-            async with self._lock:
-                for ws in dead:
-                    self.clients.discard(ws)
+        while queue.events:
+            yield queue.events.popleft()
+
+    def broadcast(self, payload: Dict[str, Any]) -> None:
+        # tylko wrzuca do kolejek klientów - nigdy nie czeka na sieć
+        if not self.clients:
+            return
+
+        msg = json.dumps(payload, ensure_ascii=False)
+        if payload.get("type") == "ui_snapshot_delta":
+            for queue in self.clients.values():
+                sub = queue.subscription
+                if not sub.filters_hens:
+                    queue.put_delta(payload, msg)
+                    continue
+                # pusta łatka też idzie dalej - niesie ciągłość wersji
+                changes = sub.filter_state(payload.get("changes") or {})
+                queue.put_delta({**payload, "changes": changes}, None)
+        else:
+            event = payload.get("event") or {}
+            for queue in self.clients.values():
+                if queue.subscription.wants_event(event):
+                    queue.put_event(msg)
 
 
 async def start_ws_server(
@@ -0,0 +1,65 @@
+import sys
+import timeit
+from pathlib import Path
+
+# uruchamiane jako `python app/benchmarks/dedup_keys.py`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from agents.ui.ui_agent_behaviour import _fingerprint, _stable_hash  # noqa: E402
+
+SENDER = "behavior_alarm@localhost"
+
+PAYLOADS = {
+    "legacy:hen_state": (
+        "legacy:hen_state",
+        {"hen_id": "simulator3@localhost", "hunger": 41, "aggression": 2},
+    ),
+    "legacy:light_change": (
+        "legacy:light_change",
+        {"level": 40, "hen_id": "simulator3@localhost", "reason": "aggression"},
+    ),
+    "critical_event:flock_anomaly": (
+        "critical_event",
+        {
+            "event": "flock_anomaly",
+            "hens": 5000,
+            "aggression": {"mean": 0.4, "std": 1.9, "band": [-3.0, 3.0]},
+            "hunger": {"mean": 42.1, "std": 11.3, "band": [24.0, 61.0]},
+            "z_threshold": 3.0,
+            "outlier_count": 20,
+            "outliers": [
+                {
+                    "hen_id": f"flock@localhost/hen{i}",
+                    "aggression": 9,
+                    "hunger": 90,
+                    "z_aggression": 4.52,
+                    "z_hunger": 4.24,
+                }
+                for i in range(20)
+            ],
+        },
+    ),
+    "conv:unknown (fallback)": (
+        "conv:diagnostics",
+        {"type": "diag", "payload": {"queue": 12, "uptime_s": 3600.5, "ok": True}},
+    ),
+}
+
+
+def main(number: int = 20000) -> None:
+    print(f"{'payload':<34}{'_stable_hash':>14}{'_fingerprint':>14}{'x':>7}")
+    for name, (kind, payload) in PAYLOADS.items():
+        old = timeit.timeit(
+            lambda: f"update:{kind}:{SENDER}:{_stable_hash(payload)}", number=number
+        )
+        new = timeit.timeit(
+            lambda: f"{kind}:{SENDER}:{_fingerprint(kind, payload)}", number=number
+        )
+        print(
+            f"{name:<34}{old / number * 1e6:>11.2f} us"
+            f"{new / number * 1e6:>11.2f} us{old / new:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import asyncio
+import multiprocessing as mp
+import signal
+import time
+
+from utils.config_loader import load_config
+from utils.topology import hen_agent_keys
+
+DEFAULT_POOLS = [
+    {"name": "control", "agents": ["@control"], "workers": 1},
+    {"name": "hens", "agents": ["@hens"], "workers": 1},
+]
+
+
+def _expand_agent_keys(names: list[str], cfg: dict) -> list[str]:
+    from run_all import control_agent_keys
+
+    keys = []
+    for name in names:
+        if name == "@control":
+            keys += control_agent_keys(cfg)
+        elif name == "@hens":
+            keys += hen_agent_keys(cfg)
+        else:
+            keys.append(name)
+    return keys
+
+
+def plan_workers(cfg: dict) -> list[tuple[str, list[str]]]:
+    pools = (cfg.get("launcher") or {}).get("pools") or DEFAULT_POOLS
+
+    plan = []
+    for pool in pools:
+        keys = _expand_agent_keys(list(pool.get("agents") or []), cfg)
+        if not keys:
+            continue
+
+        n = max(1, min(int(pool.get("workers", 1)), len(keys)))
+        for i in range(n):
+            plan.append((f"{pool.get('name', 'pool')}-{i}", keys[i::n]))
+    return plan
+
+
+def _worker_main(name: str, keys: list[str], slot: int, ready_flags, all_ready) -> None:
+    import run_all
+
+    cfg = load_config()
+    timeout_s = float((cfg.get("launcher") or {}).get("startup_timeout_s", 15.0))
+
+    async def peers_ready():
+        # bariera między workerami - initów nie wysyłamy, zanim agenci
+        # z innych procesów się zalogują
+        ready_flags[slot] = 1
+        if not await asyncio.to_thread(all_ready.wait, timeout_s):
+            print(
+                f"[LAUNCHER:{name}] Nie wszystkie workery gotowe po {timeout_s} s "
+                "- startuję mimo to."
+            )
+
+    async def runner():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))
+
+        print(f"[LAUNCHER:{name}] Start agentów: {', '.join(keys)}")
+        await run_all.run_agents(keys, cfg, stop_event=stop, peers_ready=peers_ready)
+
+    asyncio.run(runner())
+
+
+class _Worker:
+    def __init__(self, slot: int, name: str, keys: list[str]):
+        self.slot = slot
+        self.name = name
+        self.keys = keys
+        self.process: mp.Process | None = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_start_at = 0.0
+
+
+def supervise(cfg: dict) -> None:
+    launcher_cfg = cfg.get("launcher") or {}
+    backoff_s = float(launcher_cfg.get("restart_backoff_s", 1.0))
+    max_backoff_s = float(launcher_cfg.get("max_restart_backoff_s", 30.0))
+    stable_after_s = float(launcher_cfg.get("stable_after_s", 60.0))
+    stop_timeout_s = float(launcher_cfg.get("stop_timeout_s", 10.0))
+
+    if (cfg.get("transport") or {}).get("mode") == "loopback":
+        print(
+            "[LAUNCHER] UWAGA: transport loopback nie przenosi wiadomości między "
+            "procesami - użyj trybu hybrid albo xmpp."
+        )
+
+    ctx = mp.get_context("spawn")
+    workers = [
+        _Worker(i, name, keys) for i, (name, keys) in enumerate(plan_workers(cfg))
+    ]
+
+    # worker zapala swoją flagę, gdy jego agenci są zalogowani; nadzorca
+    # zwalnia wszystkich naraz. Worker zrestartowany po starcie systemu
+    # zastaje all_ready ustawione i nie czeka.
+    ready_flags = ctx.Array("b", len(workers))
+    all_ready = ctx.Event()
+
+    stopping = False
+
+    def _request_stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, _request_stop)
+    signal.signal(signal.SIGTERM, _request_stop)
+
+    def _start(w: _Worker):
+        w.process = ctx.Process(
+            target=_worker_main,
+            args=(w.name, w.keys, w.slot, ready_flags, all_ready),
+            name=w.name,
+            daemon=False,
+        )
+        w.process.start()
+        w.started_at = time.monotonic()
+        print(f"[LAUNCHER] Worker {w.name} (pid={w.process.pid}): {w.keys}")
+
+    for w in workers:
+        _start(w)
+
+    while not stopping:
+        now = time.monotonic()
+        if not all_ready.is_set() and all(ready_flags):
+            all_ready.set()
+            print("[LAUNCHER] Wszystkie workery gotowe.")
+
+        for w in workers:
+            if w.process is not None and not w.process.is_alive():
+                ready_flags[w.slot] = 0
+                print(
+                    f"[LAUNCHER] Worker {w.name} zakończył się "
+                    f"(exitcode={w.process.exitcode}) - restart."
+                )
+                if now - w.started_at >= stable_after_s:
+                    w.restarts = 0
+                w.restarts += 1
+                w.next_start_at = now + min(
+                    max_backoff_s, backoff_s * 2 ** (w.restarts - 1)
+                )
+                w.process = None
+
+            if w.process is None and now >= w.next_start_at and not stopping:
+                _start(w)
+
+        time.sleep(0.5)
+
+    print("[LAUNCHER] Zatrzymuję wszystkie workery...")
+    for w in workers:
+        if w.process is not None and w.process.is_alive():
+            w.process.terminate()
+
+    deadline = time.monotonic() + stop_timeout_s
+    for w in workers:
+        if w.process is None:
+            continue
+        w.process.join(timeout=max(0.0, deadline - time.monotonic()))
+        if w.process.is_alive():
+            print(f"[LAUNCHER] Worker {w.name} nie odpowiada - kill.")
+            w.process.kill()
+            w.process.join()
@@ -0,0 +1,152 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts      REAL NOT NULL,
+    type    TEXT NOT NULL,
+    hen_id  TEXT,
+    source  TEXT,
+    record  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_type_ts ON events (type, ts);
+CREATE INDEX IF NOT EXISTS events_hen_ts ON events (hen_id, ts);
+CREATE INDEX IF NOT EXISTS events_type_hen_ts ON events (type, hen_id, ts);
+CREATE INDEX IF NOT EXISTS events_source_ts ON events (source, ts);
+"""
+
+
+def to_epoch(value: Any) -> float | None:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def index_fields(entry: dict) -> tuple[float, str, str | None, str | None]:
+    record = entry.get("payload") or {}
+    data = record.get("data") if isinstance(record.get("data"), dict) else record
+
+    ts = to_epoch(record.get("timestamp"))
+    hen_id = data.get("hen_id") or record.get("hen_id")
+    source = record.get("source") or record.get("sender")
+
+    return (
+        ts if ts is not None else time.time(),
+        str(entry.get("type") or "unknown"),
+        str(hen_id) if hen_id else None,
+        str(source) if source else None,
+    )
+
+
+class EventIndex:
+    def __init__(self, db_path: str | Path, max_age_s: float | None = None) -> None:
+        self.path = Path(db_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age_s = max_age_s
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        self._inserts_since_prune = 0
+
+    def add_many(self, entries: list[dict]) -> None:
+        if not entries:
+            return
+
+        rows = [
+            (*index_fields(entry), json.dumps(entry, ensure_ascii=False))
+            for entry in entries
+        ]
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO events (ts, type, hen_id, source, record) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+            self._inserts_since_prune += len(rows)
+            if self.max_age_s and self._inserts_since_prune >= 10_000:
+                self._inserts_since_prune = 0
+                with self._conn:
+                    self._conn.execute(
+                        "DELETE FROM events WHERE ts < ?",
+                        (time.time() - float(self.max_age_s),),
+                    )
+
+    def query(
+        self,
+        event_type: str | None = None,
+        hen_id: str | None = None,
+        source: str | None = None,
+        since: datetime | float | str | None = None,
+        until: datetime | float | str | None = None,
+        limit: int | None = None,
+        newest_first: bool = False,
+        batch_size: int = 500,
+    ) -> Iterator[dict]:
+        where = []
+        params: list[Any] = []
+
+        for column, value in (
+            ("type", event_type),
+            ("hen_id", hen_id),
+            ("source", source),
+        ):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(str(value))
+
+        since_ts = to_epoch(since)
+        if since_ts is not None:
+            where.append("ts >= ?")
+            params.append(since_ts)
+
+        until_ts = to_epoch(until)
+        if until_ts is not None:
+            where.append("ts < ?")
+            params.append(until_ts)
+
+        sql = "SELECT record FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC" if newest_first else " ORDER BY ts, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        # osobne połączenie tylko do odczytu - w trybie WAL nie blokuje zapisu
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            cur = conn.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                for (record,) in rows:
+                    yield json.loads(record)
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
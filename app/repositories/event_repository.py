@@ -1,13 +1,71 @@
+import asyncio
 import json
-import os
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
+
+from repositories.event_index import EventIndex, index_fields, to_epoch
+from repositories.event_segments import SegmentedLog, SegmentPolicy
+
+log = logging.getLogger(__name__)
+
+# fsync po każdym zdarzeniu
+DURABILITY_ALWAYS = "always"
+# zapis grupowy: fsync co N zdarzeń albo co T ms
+DURABILITY_BATCH = "batch"
+# tylko flush do systemu operacyjnego, bez fsync
+DURABILITY_OS = "os"
+
+DURABILITY_MODES = (DURABILITY_ALWAYS, DURABILITY_BATCH, DURABILITY_OS)
 
 
 class EventRepository:
-    def __init__(self, file_path: str | Path) -> None:
+    def __init__(
+        self,
+        file_path: str | Path,
+        durability: str = DURABILITY_ALWAYS,
+        fsync_every_n: int = 100,
+        fsync_interval_ms: float = 200.0,
+        segment_policy: SegmentPolicy | None = None,
+        index: EventIndex | None = None,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"Unknown durability mode {durability!r}, expected one of {DURABILITY_MODES}"
+            )
+
         self.path = Path(file_path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._store = SegmentedLog(self.path, segment_policy)
+        self.index = index
+
+        self.durability = durability
+        self.fsync_every_n = max(1, int(fsync_every_n))
+        self.fsync_interval_s = max(0.0, float(fsync_interval_ms) / 1000.0)
+
+        self._io_lock = threading.Lock()
+
+        self._cond = threading.Condition()
+        self._pending: list[dict[str, Any]] = []
+        self._enqueued = 0
+        self._written = 0
+        self._closed = False
+        self._writer: threading.Thread | None = None
+
+        # jeden wątek I/O zachowuje kolejność zapisów z log_async
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="event-repo-io"
+        )
+
+        if self.durability == DURABILITY_BATCH:
+            self._writer = threading.Thread(
+                target=self._writer_loop, name="event-repo-writer", daemon=True
+            )
+            self._writer.start()
 
     def log(self, event_type: str, payload: dict[str, Any]) -> None:
         entry = {
@@ -15,12 +73,170 @@ class EventRepository:
             "payload": payload if isinstance(payload, dict) else {"payload": payload},
         }
 
-        line = json.dumps(entry, ensure_ascii=False)
+        if self.durability != DURABILITY_BATCH:
+            self._write_entries([entry], fsync=self.durability == DURABILITY_ALWAYS)
+            return
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("EventRepository is closed")
+            self._pending.append(entry)
+            self._enqueued += 1
+            if len(self._pending) == 1 or len(self._pending) >= self.fsync_every_n:
+                self._cond.notify_all()
+
+    async def log_async(self, event_type: str, payload: dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.log, event_type, payload)
+
+    async def flush_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.flush)
+
+    async def close_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
+
+    def flush(self) -> None:
+        if self.durability != DURABILITY_BATCH:
+            with self._io_lock:
+                self._store.flush()
+            return
+
+        with self._cond:
+            target = self._enqueued
+            self._cond.notify_all()
+            while self._written < target and self._writer_alive():
+                self._cond.wait(timeout=0.5)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+
+        if self._writer is not None:
+            self._writer.join()
+
+        with self._io_lock:
+            self._store.close()
+
+        if self.index is not None:
+            self.index.close()
+
+    def iter_events(self, newest_first: bool = False) -> Iterator[dict[str, Any]]:
+        for line in self._store.iter_lines(newest_first=newest_first):
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+    def _writer_alive(self) -> bool:
+        return self._writer is not None and self._writer.is_alive()
+
+    def _writer_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+
+                deadline = time.monotonic() + self.fsync_interval_s
+                while len(self._pending) < self.fsync_every_n and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+
+                batch, self._pending = self._pending, []
+                if not batch and self._closed:
+                    return
 
-        with self.path.open("a", encoding="utf-8") as f:
-            f.write(line + "\n")
-            f.flush()
             try:
-                os.fsync(f.fileno())
-            except Exception:
-                pass
+                self._write_entries(batch, fsync=True)
+            except Exception as e:
+                log.error(
+                    "Event batch write failed (%d events lost): %r", len(batch), e
+                )
+
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+
+    def query(
+        self,
+        event_type: str | None = None,
+        hen_id: str | None = None,
+        source: str | None = None,
+        since: datetime | float | str | None = None,
+        until: datetime | float | str | None = None,
+        limit: int | None = None,
+        newest_first: bool = False,
+    ) -> Iterator[dict[str, Any]]:
+        if self.index is not None:
+            return self.index.query(
+                event_type=event_type,
+                hen_id=hen_id,
+                source=source,
+                since=since,
+                until=until,
+                limit=limit,
+                newest_first=newest_first,
+            )
+
+        # bez indeksu zostaje pełny skan segmentów
+        return _scan_events(
+            self.iter_events(newest_first=newest_first),
+            event_type=event_type,
+            hen_id=hen_id,
+            source=source,
+            since=to_epoch(since),
+            until=to_epoch(until),
+            limit=limit,
+        )
+
+    def _write_entries(self, entries: list[dict[str, Any]], fsync: bool) -> None:
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+        with self._io_lock:
+            self._store.write(data)
+            if fsync:
+                self._store.sync()
+
+        if self.index is not None:
+            try:
+                self.index.add_many(entries)
+            except Exception as e:
+                log.error("Event index insert failed: %r", e)
+
+
+def _scan_events(
+    events: Iterator[dict[str, Any]],
+    event_type: str | None,
+    hen_id: str | None,
+    source: str | None,
+    since: float | None,
+    until: float | None,
+    limit: int | None,
+) -> Iterator[dict[str, Any]]:
+    # strumieniowo - `events` przychodzą już w żądanej kolejności
+    if limit is not None and limit <= 0:
+        return
+    matched = 0
+    for entry in events:
+        ts, etype, ehen, esource = index_fields(entry)
+        if event_type is not None and etype != event_type:
+            continue
+        if hen_id is not None and ehen != hen_id:
+            continue
+        if source is not None and esource != source:
+            continue
+        if since is not None and ts < since:
+            continue
+        if until is not None and ts >= until:
+            continue
+        yield entry
+        matched += 1
+        if limit is not None and matched >= limit:
+            return
@@ -0,0 +1,212 @@
+import gzip
+import logging
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class SegmentPolicy:
+    max_segment_bytes: int | None = 64 * 1024 * 1024
+    max_segment_age_s: float | None = None
+    compress: bool = True
+    retention_max_bytes: int | None = None
+    retention_max_age_s: float | None = None
+
+
+# Aktywny segment to zawsze `path`. Zamknięte segmenty dostają numer
+# (events.00000001.jsonl), są kompresowane w tle do .jsonl.gz i usuwane
+# zgodnie z polityką retencji.
+class SegmentedLog:
+    def __init__(self, path: str | Path, policy: SegmentPolicy | None = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.policy = policy or SegmentPolicy(max_segment_bytes=None, compress=False)
+
+        self._segment_re = re.compile(
+            rf"^{re.escape(self.path.stem)}\.(\d+){re.escape(self.path.suffix)}(\.gz)?$"
+        )
+
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._next_seq = self._last_seq() + 1
+
+        self._maintenance = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="event-segments"
+        )
+
+        # segmenty zamknięte wcześniej, ale nieskompresowane (np. po awarii)
+        for _, seg in self._sealed_segments():
+            if seg.suffix != ".gz":
+                self._maintenance.submit(self._compact, seg)
+
+    def write(self, data: str) -> None:
+        if self._file is None:
+            self._open_active()
+
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data.encode("utf-8"))
+
+        if self._should_rotate():
+            self.rotate()
+
+    def sync(self) -> None:
+        if self._file is None:
+            return
+        try:
+            os.fsync(self._file.fileno())
+        except Exception:
+            pass
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def rotate(self) -> Path | None:
+        if self._file is not None:
+            self._file.flush()
+            self.sync()
+            self._file.close()
+            self._file = None
+
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return None
+
+        sealed = self._segment_path(self._next_seq)
+        self._next_seq += 1
+        os.replace(self.path, sealed)
+        self._size = 0
+
+        self._maintenance.submit(self._compact, sealed)
+        return sealed
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            self.sync()
+            self._file.close()
+            self._file = None
+        self._maintenance.shutdown(wait=True)
+
+    def segments(self) -> list[Path]:
+        sealed = [seg for _, seg in self._sealed_segments()]
+        if self.path.exists():
+            sealed.append(self.path)
+        return sealed
+
+    def iter_lines(self, newest_first: bool = False) -> Iterator[str]:
+        if not newest_first:
+            for seg in self.segments():
+                yield from self._iter_segment(seg)
+            return
+
+        # od końca: w pamięci co najwyżej jeden segment naraz
+        for seg in reversed(self.segments()):
+            lines = list(self._iter_segment(seg))
+            lines.reverse()
+            yield from lines
+
+    def _iter_segment(self, seg: Path) -> Iterator[str]:
+        try:
+            if seg.suffix == ".gz":
+                f = gzip.open(seg, "rt", encoding="utf-8")
+            else:
+                f = seg.open("r", encoding="utf-8")
+        except FileNotFoundError:
+            # segment usunięty przez retencję albo podmieniony na .gz
+            gz = seg.with_name(seg.name + ".gz")
+            if seg.suffix == ".gz" or not gz.exists():
+                return
+            f = gzip.open(gz, "rt", encoding="utf-8")
+
+        with f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line:
+                    yield line
+
+    def _open_active(self) -> None:
+        self._file = self.path.open("a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+
+    def _should_rotate(self) -> bool:
+        max_bytes = self.policy.max_segment_bytes
+        if max_bytes and self._size >= max_bytes:
+            return True
+
+        max_age = self.policy.max_segment_age_s
+        if max_age and (time.time() - self._opened_at) >= max_age:
+            return True
+
+        return False
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.path.with_name(f"{self.path.stem}.{seq:08d}{self.path.suffix}")
+
+    def _sealed_segments(self) -> list[tuple[int, Path]]:
+        by_seq: dict[int, Path] = {}
+        for p in self.path.parent.iterdir():
+            m = self._segment_re.match(p.name)
+            if not m:
+                continue
+            seq = int(m.group(1))
+            # jeśli istnieją oba warianty, plik .gz jest już kompletny
+            if seq not in by_seq or m.group(2):
+                by_seq[seq] = p
+        return sorted(by_seq.items())
+
+    def _last_seq(self) -> int:
+        sealed = self._sealed_segments()
+        return sealed[-1][0] if sealed else 0
+
+    def _compact(self, sealed: Path) -> None:
+        try:
+            if self.policy.compress and sealed.suffix != ".gz":
+                gz = sealed.with_name(sealed.name + ".gz")
+                tmp = sealed.with_name(sealed.name + ".gz.tmp")
+                with sealed.open("rb") as src, gzip.open(tmp, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(tmp, gz)
+                sealed.unlink()
+
+            self._apply_retention()
+        except Exception as e:
+            log.error("Segment maintenance failed for %s: %r", sealed, e)
+
+    def _apply_retention(self) -> None:
+        max_bytes = self.policy.retention_max_bytes
+        max_age = self.policy.retention_max_age_s
+        if not max_bytes and not max_age:
+            return
+
+        sealed = []
+        for _, seg in self._sealed_segments():
+            try:
+                st = seg.stat()
+            except FileNotFoundError:
+                continue
+            sealed.append((seg, st.st_size, st.st_mtime))
+
+        total = sum(size for _, size, _ in sealed)
+        now = time.time()
+
+        for seg, size, mtime in sealed:
+            too_big = bool(max_bytes) and total > max_bytes
+            too_old = bool(max_age) and (now - mtime) > max_age
+            if not (too_big or too_old):
+                break
+            try:
+                seg.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -1,50 +1,134 @@
 import asyncio
+import re
+from typing import Awaitable, Callable
 
 from agents.behavior_and_alarm.behavior_and_alarm_agent import BehaviorAndAlarmAgent
 from agents.feed_control.agent import FeedControlAgent
+from agents.flock_simulator.agent import FlockSimulatorAgent
 from agents.hen_simulator.agent import HenSimulatorAgent
 from agents.lighting.lighting_agent import LightingAgent
 from agents.logger.logger_agent import LoggerAgent
 from agents.ui.ui_agent import UIAgent
 from utils.config_loader import load_config, get_agent_credentials
+from utils.readiness import arm_startup_barrier, release_startup_barrier
+from utils.topology import behavior_shard_keys, feed_shard_keys, hen_agent_keys
 
+AGENT_CLASSES = {
+    "logger": LoggerAgent,
+    "ui": UIAgent,
+    "behavior_alarm": BehaviorAndAlarmAgent,
+    "lighting": LightingAgent,
+    "feed_control": FeedControlAgent,
+    "flock_simulator": FlockSimulatorAgent,
+    "hen_simulator": HenSimulatorAgent,
+}
 
-async def main():
-    cfg = load_config()
 
-    agents = []
+def agent_class_for(key: str):
+    if key in AGENT_CLASSES:
+        return AGENT_CLASSES[key]
+    return AGENT_CLASSES[re.sub(r"\d+$", "", key)]
+
+
+def control_agent_keys(cfg: dict) -> list[str]:
+    # kolejność startu: logger i UI pierwsze, żeby nie zgubić wczesnych zdarzeń
+    return [
+        "logger",
+        "ui",
+        *behavior_shard_keys(cfg),
+        "lighting",
+        *feed_shard_keys(cfg),
+    ]
+
+
+def all_agent_keys(cfg: dict) -> list[str]:
+    return control_agent_keys(cfg) + hen_agent_keys(cfg)
+
+
+async def _start_agent(agent, timeout_s: float) -> bool:
+    try:
+        await asyncio.wait_for(agent.start(auto_register=False), timeout=timeout_s)
+    except Exception as e:
+        print(f"{type(agent).__name__} ({agent.jid}) nie wystartował: {e!r}")
+        return False
+
+    print(f"{type(agent).__name__} wystartowany jako {agent.jid}")
+    return True
+
 
-    for key, cls in [
-        ("logger", LoggerAgent),
-        ("ui", UIAgent),
-        ("behavior_alarm", BehaviorAndAlarmAgent),
-        ("lighting", LightingAgent),
-        ("feed_control", FeedControlAgent),
-        ("hen_simulator1", HenSimulatorAgent),
-        ("hen_simulator2", HenSimulatorAgent),
-        ("hen_simulator3", HenSimulatorAgent),
-        ("hen_simulator4", HenSimulatorAgent),
-        ("hen_simulator5", HenSimulatorAgent),
-    ]:
+async def _stop_agents(agents) -> None:
+    # błąd jednego (np. w połowie wystartowanego) agenta nie blokuje reszty
+    results = await asyncio.gather(*(a.stop() for a in agents), return_exceptions=True)
+    for agent, result in zip(agents, results):
+        if isinstance(result, BaseException):
+            print(f"{type(agent).__name__} ({agent.jid}) nie zatrzymał się: {result!r}")
+
+
+async def run_agents(
+    keys: list[str],
+    cfg: dict,
+    stop_event: asyncio.Event | None = None,
+    peers_ready: Callable[[], Awaitable[None]] | None = None,
+):
+    startup_timeout_s = float(
+        (cfg.get("launcher") or {}).get("startup_timeout_s", 15.0)
+    )
+
+    agents = []
+    for key in keys:
+        cls = agent_class_for(key)
         jid, password = get_agent_credentials(key, cfg)
-        a = cls(jid, password, verify_security=cfg["xmpp"]["verify_security"])
-        await a.start(auto_register=False)
-        agents.append(a)
-        print(f"{cls.__name__} wystartowany jako {jid}")
+        agents.append(
+            cls(jid, password, verify_security=cfg["xmpp"]["verify_security"])
+        )
+
+    arm_startup_barrier()
 
     print("Czekam aż wszyscy agenci zalogują się do Prosody...")
-    await asyncio.sleep(1.5)
+    started = await asyncio.gather(
+        *(_start_agent(a, startup_timeout_s) for a in agents)
+    )
+
+    if not all(started):
+        print("Nie wszystkie agenty wystartowały - zatrzymuję.")
+        await _stop_agents(agents)
+        raise RuntimeError(
+            "Agents failed to start: "
+            + ", ".join(str(a.jid) for a, ok in zip(agents, started) if not ok)
+        )
+
+    # agent.start() (SPADE 4.1.2) wraca dopiero po session_start i setup(),
+    # więc tu wszyscy agenci tego procesu są zalogowani; peers_ready czeka
+    # jeszcze na pozostałe workery launchera
+    if peers_ready is not None:
+        await peers_ready()
+    release_startup_barrier()
 
     print("Wszystkie agenty online. CTRL+C aby zakończyć.")
 
     try:
-        while True:
-            await asyncio.sleep(1)
-    except KeyboardInterrupt:
+        if stop_event is not None:
+            await stop_event.wait()
+        else:
+            while True:
+                await asyncio.sleep(1)
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
         print("Zatrzymuję wszystkich agentów...")
-        for a in agents:
-            await a.stop()
+        await _stop_agents(agents)
+
+
+async def main():
+    cfg = load_config()
+    await run_agents(all_agent_keys(cfg), cfg)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    _cfg = load_config()
+    if (_cfg.get("launcher") or {}).get("mode") == "multiprocess":
+        from launcher import supervise
+
+        supervise(_cfg)
+    else:
+        asyncio.run(main())
@@ -0,0 +1,105 @@
+from utils.alarms import (
+    ALARM_OPEN,
+    ALARM_RESOLVE,
+    ALARM_UPDATE,
+    SILO_ALARM_TYPES,
+    AlarmAggregator,
+)
+
+
+def _states(emitted: list[tuple[str, dict]]) -> list[tuple[str, str]]:
+    return [(event_type, payload["alarm_state"]) for event_type, payload in emitted]
+
+
+def test_repeats_are_coalesced_into_one_update():
+    agg = AlarmAggregator(coalesce_window_s=10, resolve_after_s=30)
+    hen = {"hen_id": "simulator1@localhost", "aggression": 8}
+
+    assert _states(agg.raise_alarm("aggression_alert", hen, now=0.0)) == [
+        ("aggression_alert", ALARM_OPEN)
+    ]
+    for t in (1.0, 2.0, 3.0):
+        assert agg.raise_alarm("aggression_alert", hen, now=t) == []
+    assert agg.flush(now=5.0) == []
+
+    [(event_type, payload)] = agg.flush(now=10.0)
+    assert payload["alarm_state"] == ALARM_UPDATE
+    assert payload["count"] == 3
+    assert payload["total_count"] == 4
+    assert payload["hen_id"] == "simulator1@localhost"
+
+
+def test_alarms_are_keyed_by_subject():
+    agg = AlarmAggregator()
+    a = agg.raise_alarm("aggression_alert", {"hen_id": "a"}, now=0.0)
+    b = agg.raise_alarm("aggression_alert", {"hen_id": "b"}, now=0.0)
+    assert len(a) == len(b) == 1
+    assert len(agg) == 2
+
+
+def test_silence_resolves_but_not_sticky_types():
+    agg = AlarmAggregator(resolve_after_s=30, sticky_types=SILO_ALARM_TYPES)
+    agg.raise_alarm("aggression_alert", {"hen_id": "a"}, now=0.0)
+    agg.raise_alarm("no_feed", {"silo": "feedcontrol@localhost"}, now=0.0)
+
+    assert _states(agg.flush(now=30.0)) == [("aggression_alert", ALARM_RESOLVE)]
+    assert agg.flush(now=1000.0) == []
+    assert len(agg) == 1
+
+    assert _states(
+        agg.clear_silo(SILO_ALARM_TYPES, "feedcontrol@localhost", now=1000.0)
+    ) == [("no_feed", ALARM_RESOLVE)]
+    assert len(agg) == 0
+
+
+def test_explicit_resolve():
+    agg = AlarmAggregator()
+    agg.raise_alarm("aggression_alert", {"hen_id": "a"}, now=0.0)
+
+    assert agg.resolve("aggression_alert", "b", now=1.0) == []
+    assert _states(agg.resolve("aggression_alert", "a", now=1.0)) == [
+        ("aggression_alert", ALARM_RESOLVE)
+    ]
+    assert len(agg) == 0
+
+
+def test_token_bucket_defers_open_until_refill():
+    agg = AlarmAggregator(max_per_s=1.0, burst=2)
+
+    emitted = []
+    for hen_id in ("a", "b", "c"):
+        emitted += agg.raise_alarm("aggression_alert", {"hen_id": hen_id}, now=0.0)
+    assert [p["hen_id"] for _, p in emitted] == ["a", "b"]
+    assert agg.suppressed == 1
+
+    assert agg.flush(now=0.5) == []
+
+    [(_, payload)] = agg.flush(now=1.0)
+    assert payload["hen_id"] == "c"
+    assert payload["alarm_state"] == ALARM_OPEN
+
+
+def test_token_bucket_defers_resolve():
+    agg = AlarmAggregator(max_per_s=1.0, burst=1)
+    agg.raise_alarm("aggression_alert", {"hen_id": "a"}, now=0.0)
+
+    # brak tokenu - alarm zostaje i czeka na zamknięcie
+    assert agg.resolve("aggression_alert", "a", now=0.5) == []
+    assert len(agg) == 1
+    assert agg.flush(now=0.8) == []
+
+    assert _states(agg.flush(now=1.0)) == [("aggression_alert", ALARM_RESOLVE)]
+    assert len(agg) == 0
+
+
+def test_unannounced_alarm_closes_silently():
+    agg = AlarmAggregator(resolve_after_s=5, max_per_s=1.0, burst=1)
+    agg.raise_alarm("aggression_alert", {"hen_id": "a"}, now=0.0)
+    assert agg.raise_alarm("aggression_alert", {"hen_id": "b"}, now=0.0) == []
+
+    # b nigdy nie dostało tokenu na open, więc nie wysyłamy jego resolve
+    emitted = agg.flush(now=5.0)
+    assert [(p["hen_id"], p["alarm_state"]) for _, p in emitted] == [
+        ("a", ALARM_RESOLVE)
+    ]
+    assert len(agg) == 0
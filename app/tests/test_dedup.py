@@ -0,0 +1,43 @@
+from agents.ui.dedup import DedupCache
+
+
+def test_repeat_inside_window_is_seen():
+    cache = DedupCache(window_s=2.0)
+    assert not cache.seen("a", now=0.0)
+    assert cache.seen("a", now=1.9)
+    assert not cache.seen("b", now=1.9)
+
+
+def test_key_expires_after_window():
+    cache = DedupCache(window_s=2.0)
+    cache.seen("a", now=0.0)
+    assert not cache.seen("a", now=2.0)
+    # ponowny zapis przesuwa okno
+    assert cache.seen("a", now=3.5)
+
+
+def test_expired_entries_are_dropped():
+    cache = DedupCache(window_s=1.0)
+    for i in range(100):
+        cache.seen(f"k{i}", now=i * 0.01)
+    assert len(cache) == 100
+
+    cache.seen("late", now=2.0)
+    assert len(cache) == 1
+
+
+def test_max_entries_evicts_oldest():
+    cache = DedupCache(window_s=60.0, max_entries=3)
+    for key in ("a", "b", "c", "d"):
+        cache.seen(key, now=0.0)
+
+    assert len(cache) == 3
+    assert not cache.seen("a", now=1.0)
+    assert cache.seen("d", now=1.0)
+
+
+def test_zero_window_never_dedups():
+    cache = DedupCache(window_s=0.0)
+    assert not cache.seen("a", now=0.0)
+    assert not cache.seen("a", now=0.0)
+    assert len(cache) <= 1
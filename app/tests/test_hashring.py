@@ -0,0 +1,73 @@
+from utils.hashring import ConsistentHashRing
+
+KEYS = [f"simulator{i}@localhost" for i in range(2000)]
+NODES = ["feedcontrol@localhost", "feedcontrol2@localhost", "feedcontrol3@localhost"]
+
+
+def _owners(ring: ConsistentHashRing) -> dict[str, str]:
+    return {key: ring.node_for(key) for key in KEYS}
+
+
+def test_empty_ring_has_no_owner():
+    assert ConsistentHashRing().node_for("simulator1@localhost") is None
+
+
+def test_owner_is_stable_across_instances():
+    # hash() w Pythonie jest losowany per proces - pierścień nie może od niego zależeć
+    a = ConsistentHashRing(NODES, vnodes=32)
+    b = ConsistentHashRing(reversed(NODES), vnodes=32)
+    assert _owners(a) == _owners(b)
+
+
+def test_every_node_gets_a_share():
+    owners = _owners(ConsistentHashRing(NODES))
+    counts = {node: list(owners.values()).count(node) for node in NODES}
+    assert all(count > len(KEYS) / len(NODES) / 3 for count in counts.values())
+
+
+def test_remove_node_drops_all_its_vnodes():
+    ring = ConsistentHashRing(NODES, vnodes=16)
+    ring.remove_node("feedcontrol2@localhost")
+
+    assert "feedcontrol2@localhost" not in ring
+    assert len(ring) == 2
+    assert len(ring._points) == len(ring._owners) == 2 * 16
+    assert "feedcontrol2@localhost" not in set(ring._owners)
+
+
+def test_remove_node_moves_only_its_keys():
+    ring = ConsistentHashRing(NODES)
+    before = _owners(ring)
+    ring.remove_node("feedcontrol2@localhost")
+    after = _owners(ring)
+
+    for key in KEYS:
+        if before[key] != "feedcontrol2@localhost":
+            assert after[key] == before[key]
+        else:
+            assert after[key] != "feedcontrol2@localhost"
+
+
+def test_add_node_takes_keys_only_for_itself():
+    ring = ConsistentHashRing(NODES[:2])
+    before = _owners(ring)
+    ring.add_node(NODES[2])
+    after = _owners(ring)
+
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert moved
+    assert all(after[key] == NODES[2] for key in moved)
+    assert len(moved) < len(KEYS) / 2
+
+
+def test_set_nodes_matches_fresh_ring_and_ignores_duplicates():
+    ring = ConsistentHashRing(NODES, vnodes=32)
+    ring.add_node(NODES[0])
+    ring.set_nodes([NODES[0], NODES[2], "feedcontrol4@localhost"])
+
+    fresh = ConsistentHashRing(
+        [NODES[0], NODES[2], "feedcontrol4@localhost"], vnodes=32
+    )
+    assert ring.nodes == fresh.nodes
+    assert len(ring._points) == 3 * 32
+    assert _owners(ring) == _owners(fresh)
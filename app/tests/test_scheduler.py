@@ -0,0 +1,135 @@
+from agents.feed_control.scheduler import FeedingScheduler
+
+
+def _scheduler(cooldown_s: float = 2.0) -> FeedingScheduler:
+    return FeedingScheduler(
+        hunger_threshold=10, cooldown_s=cooldown_s, wheel_slot_s=0.5
+    )
+
+
+def test_pop_batch_hungriest_first_and_limited_to_k():
+    s = _scheduler()
+    for hen_id, hunger in (("a", 20), ("b", 50), ("c", 5), ("d", 35)):
+        s.update(hen_id, hunger)
+
+    assert len(s) == 3
+    assert s.pop_batch(2, now=0.0) == [("b", 50), ("d", 35)]
+    assert s.pop_batch(5, now=0.0) == [("a", 20)]
+    assert s.pop_batch(5, now=0.0) == []
+
+
+def test_stale_heap_entries_are_skipped():
+    s = _scheduler()
+    s.update("a", 20)
+    s.update("a", 60)
+    s.update("b", 40)
+    # spadek poniżej progu wycofuje kurę z kolejki
+    s.update("b", 3)
+
+    assert s.pop_batch(5, now=0.0) == [("a", 60)]
+    assert len(s) == 0
+
+
+def test_requeue_after_failed_dispense():
+    s = _scheduler()
+    s.update("a", 30)
+    assert s.pop_batch(1, now=0.0) == [("a", 30)]
+
+    s.requeue("a")
+    assert s.pop_batch(1, now=0.0) == [("a", 30)]
+
+
+def test_mark_fed_cools_down_until_deadline():
+    s = _scheduler(cooldown_s=2.0)
+    s.update("a", 30)
+    s.pop_batch(1, now=10.0)
+    s.mark_fed("a", now=10.0)
+    assert s.is_cooling("a")
+    assert s.fed_at("a") == 10.0
+
+    # nowy głód w trakcie cooldownu jest zapamiętany, ale nie kolejkowany
+    s.update("a", 45)
+    assert s.pop_batch(1, now=11.9) == []
+    assert s.is_cooling("a")
+
+    assert s.pop_batch(1, now=12.0) == [("a", 45)]
+    assert s.cooling == 0
+
+
+def test_advance_in_small_steps_across_wheel_wrap():
+    # 2 s / 0.5 s -> koło ma 6 slotów, więc 10 s to kilka pełnych obrotów
+    s = _scheduler(cooldown_s=2.0)
+    s.update("a", 30)
+    s.update("b", 40)
+    s.mark_fed("a", now=0.0)
+
+    fed = {"a"}
+    released: dict[str, float] = {}
+    for step in range(1, 101):
+        t = step / 10
+        if t == 1.0:
+            s.mark_fed("b", now=t)
+            fed.add("b")
+        s.advance(t)
+        for hen_id in fed:
+            if hen_id not in released and not s.is_cooling(hen_id):
+                released[hen_id] = t
+
+    assert released == {"a": 2.0, "b": 3.0}
+    assert s.pop_batch(5, now=10.0) == [("b", 40), ("a", 30)]
+
+
+def test_advance_after_long_gap_releases_everything():
+    s = _scheduler(cooldown_s=2.0)
+    for i, hen_id in enumerate(("a", "b", "c")):
+        s.update(hen_id, 30 + i)
+        s.mark_fed(hen_id, now=0.1 * i)
+
+    s.advance(1000.0)
+    assert s.cooling == 0
+    assert s.pop_batch(5, now=1000.0) == [("c", 32), ("b", 31), ("a", 30)]
+
+
+def test_zero_cooldown_requeues_immediately():
+    s = _scheduler(cooldown_s=0.0)
+    s.update("a", 30)
+    s.pop_batch(1, now=0.0)
+    s.mark_fed("a", now=0.0)
+
+    assert not s.is_cooling("a")
+    assert s.pop_batch(1, now=0.0) == [("a", 30)]
+
+
+def test_restore_fed_keeps_remaining_cooldown():
+    s = _scheduler(cooldown_s=2.0)
+    s.update("a", 30)
+    s.restore_fed("a", fed_at=99.5, now=100.0)
+
+    assert s.is_cooling("a")
+    assert s.fed_at("a") == 99.5
+    assert s.pop_batch(1, now=101.0) == []
+    assert s.pop_batch(1, now=101.5) == [("a", 30)]
+
+
+def test_restore_fed_after_cooldown_is_noop():
+    s = _scheduler(cooldown_s=2.0)
+    s.update("a", 30)
+    s.restore_fed("a", fed_at=90.0, now=100.0)
+
+    assert not s.is_cooling("a")
+    assert s.pop_batch(1, now=100.0) == [("a", 30)]
+
+
+def test_remove_drops_queued_and_cooling_hens():
+    s = _scheduler()
+    s.update("a", 30)
+    s.update("b", 40)
+    s.mark_fed("b", now=0.0)
+
+    s.remove("a")
+    s.remove("b")
+
+    assert s.hunger_of("a") is None
+    assert s.cooling == 0
+    s.advance(10.0)
+    assert s.pop_batch(5, now=10.0) == []
@@ -0,0 +1,165 @@
+from dataclasses import dataclass, field
+
+ALARM_OPEN = "open"
+ALARM_UPDATE = "update"
+ALARM_RESOLVE = "resolve"
+
+# alarmy silosu - wysyłane raz na przejście, zamyka je jawne feed_restored
+SILO_ALARM_TYPES = ("low_feed_warning", "no_feed")
+FEED_RESTORED = "feed_restored"
+
+
+@dataclass
+class Alarm:
+    event_type: str
+    # kura albo silos, którego dotyczy alarm
+    subject: str | None
+    opened_at: float
+    last_seen: float
+    payload: dict = field(default_factory=dict)
+
+    total_count: int = 1
+    # wystąpienia od ostatniej wysłanej wiadomości
+    pending: int = 1
+    last_emitted_at: float | None = None
+    announced: bool = False
+    # resolve czeka na wolny token
+    resolving: bool = False
+
+
+def _subject_of(payload: dict) -> str | None:
+    return payload.get("hen_id") or payload.get("silo")
+
+
+class AlarmAggregator:
+    # Alarmy kluczowane (typ, kura albo silos): pierwsze wystąpienie otwiera
+    # alarm, powtórzenia w oknie są zliczane i wysyłane zbiorczo jako update,
+    # cisza przez resolve_after_s zamyka alarm. Typy z sticky_types przychodzą
+    # raz na zmianę stanu, więc cisza nic o nich nie mówi - zamyka je tylko
+    # jawny resolve/clear. Całe wyjście przechodzi przez token bucket, więc
+    # podczas incydentu liczba wiadomości jest ograniczona.
+    def __init__(
+        self,
+        coalesce_window_s: float = 10.0,
+        resolve_after_s: float = 30.0,
+        max_per_s: float = 5.0,
+        burst: int = 20,
+        sticky_types=(),
+    ):
+        self.coalesce_window_s = max(0.0, float(coalesce_window_s))
+        self.resolve_after_s = max(0.0, float(resolve_after_s))
+        self.max_per_s = max(0.001, float(max_per_s))
+        self.burst = max(1, int(burst))
+        self.sticky_types = frozenset(sticky_types or ())
+
+        self._alarms: dict[tuple[str, str | None], Alarm] = {}
+        self._tokens = float(self.burst)
+        self._tokens_at: float | None = None
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self._alarms)
+
+    def raise_alarm(
+        self, event_type: str, payload: dict, now: float
+    ) -> list[tuple[str, dict]]:
+        payload = dict(payload or {})
+        key = (event_type, _subject_of(payload))
+        alarm = self._alarms.get(key)
+
+        if alarm is None:
+            alarm = Alarm(
+                event_type=event_type,
+                subject=key[1],
+                opened_at=now,
+                last_seen=now,
+                payload=payload,
+            )
+            self._alarms[key] = alarm
+            return self._try_emit(alarm, ALARM_OPEN, now)
+
+        alarm.total_count += 1
+        alarm.pending += 1
+        alarm.last_seen = now
+        alarm.payload = payload
+        alarm.resolving = False
+
+        if alarm.announced and now - alarm.last_emitted_at < self.coalesce_window_s:
+            return []
+        return self._try_emit(
+            alarm, ALARM_UPDATE if alarm.announced else ALARM_OPEN, now
+        )
+
+    def resolve(
+        self, event_type: str, subject: str | None, now: float
+    ) -> list[tuple[str, dict]]:
+        alarm = self._alarms.get((event_type, subject))
+        if alarm is None:
+            return []
+        return self._close(alarm, now)
+
+    def clear_silo(self, event_types, silo: str, now: float) -> list[tuple[str, dict]]:
+        out = []
+        for alarm in list(self._alarms.values()):
+            if alarm.event_type in event_types and alarm.payload.get("silo") == silo:
+                out += self._close(alarm, now)
+        return out
+
+    def flush(self, now: float) -> list[tuple[str, dict]]:
+        out = []
+        for alarm in list(self._alarms.values()):
+            if alarm.resolving or (
+                alarm.event_type not in self.sticky_types
+                and now - alarm.last_seen >= self.resolve_after_s
+            ):
+                out += self._close(alarm, now)
+            elif not alarm.announced:
+                out += self._try_emit(alarm, ALARM_OPEN, now)
+            elif (
+                alarm.pending and now - alarm.last_emitted_at >= self.coalesce_window_s
+            ):
+                out += self._try_emit(alarm, ALARM_UPDATE, now)
+        return out
+
+    def _close(self, alarm: Alarm, now: float) -> list[tuple[str, dict]]:
+        if not alarm.announced:
+            # nikt nie dostał open - nie ma czego zamykać
+            del self._alarms[(alarm.event_type, alarm.subject)]
+            return []
+
+        out = self._try_emit(alarm, ALARM_RESOLVE, now)
+        if out:
+            del self._alarms[(alarm.event_type, alarm.subject)]
+        else:
+            alarm.resolving = True
+        return out
+
+    def _take_token(self, now: float) -> bool:
+        if self._tokens_at is not None:
+            self._tokens = min(
+                float(self.burst),
+                self._tokens + (now - self._tokens_at) * self.max_per_s,
+            )
+        self._tokens_at = now
+
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def _try_emit(self, alarm: Alarm, state: str, now: float) -> list[tuple[str, dict]]:
+        if not self._take_token(now):
+            self.suppressed += 1
+            return []
+
+        payload = {
+            **alarm.payload,
+            "alarm_state": state,
+            "count": alarm.pending,
+            "total_count": alarm.total_count,
+            "open_for_s": round(now - alarm.opened_at, 1),
+        }
+        alarm.pending = 0
+        alarm.last_emitted_at = now
+        alarm.announced = True
+        return [(alarm.event_type, payload)]
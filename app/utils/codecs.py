@@ -0,0 +1,107 @@
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, Callable
+
+try:
+    import msgpack
+except ImportError:  # zależność opcjonalna
+    msgpack = None
+
+
+@dataclass(frozen=True)
+class Codec:
+    language: str
+    encode: Callable[[dict], str]
+    decode: Callable[[str], Any]
+
+
+_CODECS: dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec) -> None:
+    _CODECS[codec.language] = codec
+
+
+def get_codec(language: str | None) -> Codec | None:
+    return _CODECS.get(language or "json")
+
+
+def available_languages() -> list[str]:
+    return sorted(_CODECS)
+
+
+# Najczęstsze klucze w komunikatach kurnika. Kolejność jest częścią formatu -
+# nowe klucze dopisujemy wyłącznie na końcu.
+_COMPACT_KEYS = (
+    "type",
+    "source",
+    "payload",
+    "hen_id",
+    "hunger",
+    "aggression",
+    "threshold",
+    "event",
+    "level",
+    "reason",
+    "amount",
+    "portion",
+    "remaining_feed",
+    "capacity",
+    "hunger_before",
+    "hens",
+    "hunger_high_threshold",
+    "aggression_threshold",
+    "event_type",
+)
+_COMPACT_ALIAS = {key: f"~{i:x}" for i, key in enumerate(_COMPACT_KEYS)}
+
+
+def _compact_keys(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        out = {}
+        for k, v in obj.items():
+            k = str(k)
+            alias = _COMPACT_ALIAS.get(k)
+            if alias is None:
+                alias = "~" + k if k.startswith("~") else k
+            out[alias] = _compact_keys(v)
+        return out
+    if isinstance(obj, list):
+        return [_compact_keys(x) for x in obj]
+    return obj
+
+
+def _expand_object(obj: dict) -> dict:
+    out = {}
+    for k, v in obj.items():
+        if k.startswith("~~"):
+            k = k[1:]
+        elif k.startswith("~"):
+            k = _COMPACT_KEYS[int(k[1:], 16)]
+        out[k] = v
+    return out
+
+
+register_codec(Codec("json", encode=json.dumps, decode=json.loads))
+
+register_codec(
+    Codec(
+        "json-compact",
+        encode=lambda content: json.dumps(
+            _compact_keys(content), separators=(",", ":"), ensure_ascii=False
+        ),
+        decode=lambda body: json.loads(body, object_hook=_expand_object),
+    )
+)
+
+if msgpack is not None:
+    register_codec(
+        Codec(
+            "msgpack",
+            encode=lambda content: base64.b64encode(
+                msgpack.packb(content, use_bin_type=True)
+            ).decode("ascii"),
+            decode=lambda body: msgpack.unpackb(base64.b64decode(body), raw=False),
+        )
+    )
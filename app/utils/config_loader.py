@@ -1,6 +1,8 @@
 import json
 from pathlib import Path
 
+from utils.topology import hen_credentials
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 
 
@@ -13,5 +15,10 @@ def load_config() -> dict:
 def get_agent_credentials(name: str, cfg: dict | None = None) -> tuple[str, str]:
     if cfg is None:
         cfg = load_config()
-    agent_cfg = cfg["agents"][name]
+    agent_cfg = (cfg.get("agents", {}) or {}).get(name)
+    if agent_cfg is None:
+        creds = hen_credentials(name, cfg)
+        if creds is None:
+            raise KeyError(name)
+        return creds
     return agent_cfg["jid"], agent_cfg["password"]
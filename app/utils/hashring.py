@@ -0,0 +1,67 @@
+import bisect
+import hashlib
+
+
+def _hash(key: str) -> int:
+    # stabilny między procesami (w przeciwieństwie do wbudowanego hash())
+    return int.from_bytes(
+        hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+class ConsistentHashRing:
+    # Pierścień spójnego haszowania: każdy węzeł ma `vnodes` punktów na
+    # pierścieniu, klucz należy do pierwszego punktu zgodnie z ruchem wskazówek.
+    # Dodanie/usunięcie węzła przenosi tylko ~1/N kluczy.
+    def __init__(self, nodes=(), vnodes: int = 64):
+        self.vnodes = max(1, int(vnodes))
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        self._nodes: set[str] = set()
+        for node in nodes:
+            self.add_node(node)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    @property
+    def nodes(self) -> list[str]:
+        return sorted(self._nodes)
+
+    def add_node(self, node: str) -> None:
+        node = str(node)
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            idx = bisect.bisect_left(self._points, point)
+            self._points.insert(idx, point)
+            self._owners.insert(idx, node)
+
+    def remove_node(self, node: str) -> None:
+        node = str(node)
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def set_nodes(self, nodes) -> None:
+        nodes = {str(n) for n in nodes}
+        for node in list(self._nodes - nodes):
+            self.remove_node(node)
+        for node in sorted(nodes - self._nodes):
+            self.add_node(node)
+
+    def node_for(self, key: str) -> str | None:
+        if not self._points:
+            return None
+        idx = bisect.bisect_right(self._points, _hash(str(key)))
+        if idx == len(self._points):
+            idx = 0
+        return self._owners[idx]
@@ -1,6 +1,72 @@
-import json
+from functools import lru_cache
+from typing import Callable
 
 from spade.message import Message
+from spade.template import Template
+
+from utils.codecs import Codec, available_languages, get_codec
+from utils.config_loader import load_config
+
+
+@lru_cache(maxsize=1)
+def default_language() -> str:
+    messaging_cfg = load_config().get("messaging") or {}
+    language = str(messaging_cfg.get("codec", "json"))
+    if get_codec(language) is None:
+        print(f"[MSG] Nieznany kodek {language!r} - używam json.")
+        return "json"
+    return language
+
+
+def _copy_content(obj):
+    # treść to drzewo JSON (dict/list/skalary) - szybciej niż copy.deepcopy
+    if isinstance(obj, dict):
+        return {k: _copy_content(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_copy_content(v) for v in obj]
+    return obj
+
+
+# Treść trzymana jako dict i kodowana dopiero przy pierwszym odczycie body.
+# Przy dostarczeniu w obrębie procesu (utils.transport) body nigdy nie jest
+# potrzebne, więc nie ma ani serializacji, ani parsowania.
+class ContentMessage(Message):
+    def __init__(self, to: str, content: dict, codec: Codec):
+        super().__init__(to=to)
+        self.content = content
+        self._codec = codec
+
+    @property
+    def body(self) -> str:
+        if not self._body and self.content is not None:
+            self._body = self._codec.encode(self.content)
+        return self._body
+
+    @body.setter
+    def body(self, body: str | None) -> None:
+        Message.body.fset(self, body)
+        self.content = None
+
+    def copy(self) -> "ContentMessage":
+        # każdy odbiorca dostaje własną treść - zmiany u jednego nie wyciekają
+        # do nadawcy ani do innych zachowań
+        clone = ContentMessage(
+            to=str(self.to), content=_copy_content(self.content), codec=self._codec
+        )
+        clone._body = self._body
+        clone.sender = self.sender
+        clone.thread = self.thread
+        clone.metadata = dict(self.metadata)
+        return clone
+
+    def __str__(self) -> str:
+        if self._body or self.content is None:
+            return super().__str__()
+        return (
+            f'<message to="{self.to}" from="{self.sender}" thread="{self.thread}" '
+            f"metadata={self.metadata}>\n({self._codec.language}, nieserializowana)\n"
+            "</message>"
+        )
 
 
 def build_message(
@@ -8,21 +74,78 @@ def build_message(
     performative: str,
     conversation: str | None,
     content: dict,
+    language: str | None = None,
 ) -> Message:
-    msg = Message(to=to)
+    codec = get_codec(language or default_language())
+    if codec is None:
+        raise ValueError(
+            f"Nieznany kodek {language!r}, dostępne: {', '.join(available_languages())}"
+        )
+
+    msg = ContentMessage(to=to, content=content, codec=codec)
     msg.set_metadata("performative", performative)
     if conversation:
         msg.set_metadata("conversation", conversation)
-    msg.set_metadata("language", "json")
+    msg.set_metadata("language", codec.language)
     msg.set_metadata("ontology", "hen_house")
-    msg.body = json.dumps(content)
     return msg
 
 
 def parse_content(msg: Message) -> dict:
+    content = getattr(msg, "content", None)
+    if content is not None:
+        return content
+
     if not msg.body:
         return {}
+
+    codec = get_codec(msg.get_metadata("language")) or get_codec("json")
     try:
-        return json.loads(msg.body)
-    except json.JSONDecodeError:
+        return codec.decode(msg.body)
+    except Exception:
         return {"raw": msg.body}
+
+
+def conversation_template(conversation: str) -> Template:
+    return Template(metadata={"conversation": conversation})
+
+
+class _NoMessages(Template):
+    def match(self, message) -> bool:
+        return False
+
+
+# Dla zachowań okresowych, które nie czytają skrzynki - zachowanie bez szablonu
+# dostaje od SPADE kopię każdej wiadomości i jego kolejka rośnie bez końca.
+NO_MESSAGES = _NoMessages()
+
+
+def batch_entries(content: dict) -> list[dict]:
+    entries = content.get("hens") if isinstance(content, dict) else None
+    if not isinstance(entries, list):
+        return []
+    return [e for e in entries if isinstance(e, dict) and e.get("hen_id")]
+
+
+async def forward_entries(
+    behaviour,
+    owner: str,
+    conversation: str,
+    entries: list[dict],
+    project: Callable[[dict], dict],
+):
+    # kura trafiła do złego sharda (np. nieaktualny pierścień u nadawcy) -
+    # odsyłamy ją właścicielowi jako flock_state_batch z flagą forwarded
+    await behaviour.send(
+        build_message(
+            to=owner,
+            performative="inform",
+            conversation=conversation,
+            content={
+                "type": "flock_state_batch",
+                "source": str(behaviour.agent.jid),
+                "forwarded": True,
+                "hens": [project(e) for e in entries],
+            },
+        )
+    )
@@ -0,0 +1,30 @@
+import asyncio
+
+# Bariera startowa systemu: launcher ją uzbraja przed startem agentów i zwalnia,
+# gdy wszyscy są gotowi. Zachowania, które wysyłają coś w on_start, czekają na
+# nią, żeby pierwsze komunikaty nie przepadły. Agent uruchomiony samodzielnie
+# (bez launchera) nie czeka wcale.
+#
+# Bariera jest per proces. W trybie multiprocess launcher przed jej
+# zwolnieniem czeka dodatkowo, aż zalogują się agenci wszystkich workerów.
+_system_ready: asyncio.Event | None = None
+
+
+def arm_startup_barrier() -> None:
+    global _system_ready
+    _system_ready = asyncio.Event()
+
+
+def release_startup_barrier() -> None:
+    if _system_ready is not None:
+        _system_ready.set()
+
+
+async def wait_until_system_ready(timeout: float | None = 30.0) -> bool:
+    if _system_ready is None:
+        return True
+    try:
+        await asyncio.wait_for(_system_ready.wait(), timeout=timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
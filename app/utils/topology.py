@@ -0,0 +1,151 @@
+import re
+
+from utils.hashring import ConsistentHashRing
+
+# Topologia kurnika: klucze agentów, JID-y i hasła kur wyliczane z configu,
+# wspólne dla launchera i wszystkich agentów - bez list simulator1..N w kodzie.
+HEN_AGENT_PREFIX = "hen_simulator"
+FLOCK_AGENT_KEY = "flock_simulator"
+FEED_CONTROL_KEY = "feed_control"
+BEHAVIOR_ALARM_KEY = "behavior_alarm"
+
+SHARD_ROLES = ("feeding", "behavior")
+
+DEFAULT_HEN_JID_PATTERN = "simulator{i}@{domain}"
+DEFAULT_FLOCK_HEN_ID_PATTERN = "{jid}/hen{i}"
+
+_HEN_KEY_RE = re.compile(rf"^{HEN_AGENT_PREFIX}(\d+)$")
+
+
+def _hen_cfg(cfg: dict) -> dict:
+    return cfg.get("hen_simulator", {}) or {}
+
+
+def _flock_cfg(cfg: dict) -> dict:
+    return cfg.get("flock_simulator", {}) or {}
+
+
+def flock_enabled(cfg: dict) -> bool:
+    return bool(_flock_cfg(cfg).get("enabled"))
+
+
+def hen_domain(cfg: dict) -> str:
+    return str(
+        _hen_cfg(cfg).get("domain")
+        or (cfg.get("xmpp", {}) or {}).get("host")
+        or "localhost"
+    )
+
+
+def hen_count(cfg: dict) -> int:
+    if flock_enabled(cfg):
+        return max(0, int(_flock_cfg(cfg).get("count", 0)))
+    return max(0, int(_hen_cfg(cfg).get("count", 0)))
+
+
+def hen_agent_key(i: int) -> str:
+    return f"{HEN_AGENT_PREFIX}{i}"
+
+
+def hen_index(key: str) -> int | None:
+    m = _HEN_KEY_RE.match(key)
+    return int(m.group(1)) if m else None
+
+
+def hen_jid(i: int, cfg: dict) -> str:
+    pattern = str(_hen_cfg(cfg).get("jid_pattern", DEFAULT_HEN_JID_PATTERN))
+    return pattern.format(i=i, domain=hen_domain(cfg))
+
+
+def hen_password(cfg: dict) -> str:
+    return str(_hen_cfg(cfg).get("password", ""))
+
+
+def hen_credentials(key: str, cfg: dict) -> tuple[str, str] | None:
+    i = hen_index(key)
+    if i is None:
+        return None
+    return hen_jid(i, cfg), hen_password(cfg)
+
+
+def hen_agent_keys(cfg: dict) -> list[str]:
+    if flock_enabled(cfg):
+        return [FLOCK_AGENT_KEY]
+    return [hen_agent_key(i) for i in range(1, hen_count(cfg) + 1)]
+
+
+def flock_hen_ids(cfg: dict, flock_jid: str | None = None) -> list[str]:
+    if flock_jid is None:
+        flock_jid = cfg["agents"][FLOCK_AGENT_KEY]["jid"]
+    pattern = str(_flock_cfg(cfg).get("hen_id_pattern", DEFAULT_FLOCK_HEN_ID_PATTERN))
+    return [pattern.format(jid=flock_jid, i=i) for i in range(1, hen_count(cfg) + 1)]
+
+
+def hen_ids(cfg: dict) -> list[str]:
+    if flock_enabled(cfg):
+        return flock_hen_ids(cfg)
+    return [hen_jid(i, cfg) for i in range(1, hen_count(cfg) + 1)]
+
+
+def _shard_entries(cfg: dict, section: str, default_key: str) -> list[dict]:
+    shards = (cfg.get(section, {}) or {}).get("shards") or [{"agent": default_key}]
+    return [s if isinstance(s, dict) else {"agent": str(s)} for s in shards]
+
+
+def shard_keys(cfg: dict, section: str, default_key: str) -> list[str]:
+    return [str(s["agent"]) for s in _shard_entries(cfg, section, default_key)]
+
+
+def shard_jids(cfg: dict, section: str, default_key: str) -> list[str]:
+    return [cfg["agents"][key]["jid"] for key in shard_keys(cfg, section, default_key)]
+
+
+def shard_ring(cfg: dict, section: str, default_key: str) -> ConsistentHashRing:
+    vnodes = int((cfg.get(section, {}) or {}).get("ring_vnodes", 64))
+    return ConsistentHashRing(shard_jids(cfg, section, default_key), vnodes=vnodes)
+
+
+def shard_settings(cfg: dict, section: str, default_key: str, jid: str) -> dict:
+    # ustawienia sekcji nadpisane tym, co podano przy konkretnym shardzie
+    base = dict(cfg.get(section, {}) or {})
+    base.pop("shards", None)
+    for entry in _shard_entries(cfg, section, default_key):
+        key = str(entry["agent"])
+        if cfg["agents"].get(key, {}).get("jid") == jid:
+            base.update({k: v for k, v in entry.items() if k != "agent"})
+    return base
+
+
+def feed_shard_keys(cfg: dict) -> list[str]:
+    return shard_keys(cfg, "feeding", FEED_CONTROL_KEY)
+
+
+def feed_ring(cfg: dict) -> ConsistentHashRing:
+    return shard_ring(cfg, "feeding", FEED_CONTROL_KEY)
+
+
+def feed_settings(cfg: dict, jid: str) -> dict:
+    return shard_settings(cfg, "feeding", FEED_CONTROL_KEY, jid)
+
+
+def behavior_shard_keys(cfg: dict) -> list[str]:
+    return shard_keys(cfg, "behavior", BEHAVIOR_ALARM_KEY)
+
+
+def behavior_ring(cfg: dict) -> ConsistentHashRing:
+    return shard_ring(cfg, "behavior", BEHAVIOR_ALARM_KEY)
+
+
+def behavior_settings(cfg: dict, jid: str) -> dict:
+    return shard_settings(cfg, "behavior", BEHAVIOR_ALARM_KEY, jid)
+
+
+def parse_membership(content: dict) -> tuple[str, list[str]] | None:
+    # {"type": "shard_membership", "role": "feeding"|"behavior", "shards": [jid]}
+    if not isinstance(content, dict) or content.get("type") != "shard_membership":
+        return None
+    role = content.get("role")
+    shards = content.get("shards")
+    if role not in SHARD_ROLES or not isinstance(shards, list):
+        return None
+    return role, [str(s) for s in shards if s]
@@ -0,0 +1,62 @@
+from functools import lru_cache
+
+from slixmpp import JID
+
+from utils.config_loader import load_config
+
+# zwykły SPADE: wszystko przez serwer XMPP
+TRANSPORT_XMPP = "xmpp"
+# agenci z tego procesu dostają wiadomości bezpośrednio, reszta przez XMPP
+TRANSPORT_HYBRID = "hybrid"
+# tylko w obrębie procesu, bez logowania do serwera XMPP
+TRANSPORT_LOOPBACK = "loopback"
+
+TRANSPORT_MODES = (TRANSPORT_XMPP, TRANSPORT_HYBRID, TRANSPORT_LOOPBACK)
+
+_local_agents: dict[str, object] = {}
+
+
+@lru_cache(maxsize=1)
+def transport_mode() -> str:
+    mode = str((load_config().get("transport") or {}).get("mode", TRANSPORT_XMPP))
+    if mode not in TRANSPORT_MODES:
+        print(f"[TRANSPORT] Nieznany tryb {mode!r} - używam {TRANSPORT_XMPP}.")
+        return TRANSPORT_XMPP
+    return mode
+
+
+def register_local(agent) -> None:
+    _local_agents[str(agent.jid.bare)] = agent
+
+
+def unregister_local(agent) -> None:
+    if _local_agents.get(str(agent.jid.bare)) is agent:
+        del _local_agents[str(agent.jid.bare)]
+
+
+def local_agent_for(jid) -> object | None:
+    bare = jid.bare if isinstance(jid, JID) else JID(str(jid)).bare
+    return _local_agents.get(str(bare))
+
+
+class LoopbackRouter:
+    def __init__(self, container, mode: str) -> None:
+        self._container = container
+        self.mode = mode
+
+    def __getattr__(self, name):
+        return getattr(self._container, name)
+
+    async def send(self, msg, behaviour) -> None:
+        recipient = local_agent_for(msg.to)
+        if recipient is not None and recipient.is_alive():
+            recipient.dispatch(msg)
+            return
+
+        if self.mode == TRANSPORT_LOOPBACK:
+            print(
+                f"[TRANSPORT] Brak lokalnego odbiorcy {msg.to} - wiadomość pominięta."
+            )
+            return
+
+        await self._container.send(msg, behaviour)
@@ -62,6 +62,7 @@ export class App implements OnInit, OnDestroy {
       ["low_feed_warning", "Mało paszy"],
       ["aggression_alert", "Wykryto agresję"],
       ["no_feed", "Brak paszy"],
+      ["flock_anomaly", "Anomalia w stadzie"],
     ]);
     let message = "";
     if (eventName == 'low_feed_warning') {
@@ -75,6 +76,16 @@ export class App implements OnInit, OnDestroy {
     if (eventName == 'no_feed') {
       message = "Nie udało się nakarmić kury " + payload["hen_id"] + " - brak paszy w zbiorniku.";
     }
+
+    if (eventName == 'flock_anomaly') {
+      message = "Odstające kury: " + payload["outlier_count"] + " z " + payload["hens"] + ".";
+    }
+
+    if (payload["alarm_state"] == 'resolve') {
+      message = "Alarm zakończony po " + payload["open_for_s"] + " s (" + payload["total_count"] + " zgłoszeń).";
+    } else if (payload["alarm_state"] == 'update') {
+      message += " (x" + payload["count"] + ")";
+    }
     return {
       ts: ev.ts,
       title: typeMap.get(eventName),
@@ -18,6 +18,8 @@ export type FeedState = {
   hen_id?: HenId | null;
   portion?: number | null;
   hunger_before?: number | null;
+  fed_hens?: number | null;
+  total_portion?: number | null;
 };
 
 export type LightEntry = {
@@ -29,6 +31,7 @@ export type LightEntry = {
 
 export type UiState = {
   feed: FeedState;
+  feeds_by_silo?: Record<string, FeedState>;
   light: Record<string, never> | Record<string, unknown>; // u Ciebie obecnie {}
   lights_by_hen: Record<HenId, LightEntry>;
   hens: Record<HenId, HenState>;
@@ -75,8 +78,18 @@ export type CriticalEvent =
 export type UiSnapshotMessage = {
   type: "ui_snapshot";
   ts: IsoUtcString;
+  version?: number;
   state: UiState;
-  events: CriticalEvent[];
+  events?: CriticalEvent[];
+};
+
+/** Łatka: sekcje słownikowe niosą tylko zmienione wpisy, feed/light w całości */
+export type UiSnapshotDeltaMessage = {
+  type: "ui_snapshot_delta";
+  ts: IsoUtcString;
+  version: number;
+  base_version: number;
+  changes: Partial<UiState>;
 };
 
 export type UiEventMessage = {
@@ -91,6 +104,13 @@ export type UiEventMessage = {
   };
 };
 
+/** Filtr po stronie serwera; pominięte pole = bez ograniczenia */
+export type WsSubscription = {
+  hen_ids?: HenId[];
+  event_types?: string[];
+  max_snapshot_rate_hz?: number;
+};
+
 export type WsEvent = UiSnapshotMessage | UiEventMessage;
 
 @Injectable({ providedIn: 'root' })
@@ -99,6 +119,11 @@ export class WsService {
 
   private socket?: WebSocket;
 
+  private state?: UiState;
+  private version = -1;
+  private resyncPending = false;
+  private subscription?: WsSubscription;
+
   private eventsSubject = new Subject<WsEvent>();
   readonly events$ = this.eventsSubject.asObservable();
 
@@ -107,18 +132,70 @@ export class WsService {
 
     this.socket = new WebSocket(url);
 
-    this.socket.addEventListener('open', () => console.log('[WS] connected'));
+    this.socket.addEventListener('open', () => {
+      console.log('[WS] connected');
+      if (this.subscription) this.sendSubscription();
+    });
     this.socket.addEventListener('close', () => console.log('[WS] disconnected'));
     this.socket.addEventListener('error', (e: Event) => console.error('[WS] error', e));
 
     this.socket.addEventListener('message', (msg: MessageEvent) => {
+      let data: WsEvent | UiSnapshotDeltaMessage;
       try {
-        const data = JSON.parse(String(msg.data)) as WsEvent;
-        this.zone.run(() => this.eventsSubject.next(data));
+        data = JSON.parse(String(msg.data));
       } catch {
         console.warn('[WS] non-json message:', msg.data);
+        return;
       }
+
+      const evt = this.applySnapshot(data);
+      if (evt) this.zone.run(() => this.eventsSubject.next(evt));
     });
   }
 
+  subscribe(subscription: WsSubscription): void {
+    this.subscription = subscription;
+    if (this.socket?.readyState === WebSocket.OPEN) this.sendSubscription();
+  }
+
+  private sendSubscription(): void {
+    this.socket?.send(JSON.stringify({type: 'subscribe', ...this.subscription}));
+  }
+
+  /** Składa pełny stan z łatek; przy luce w wersjach prosi serwer o resync. */
+  private applySnapshot(data: WsEvent | UiSnapshotDeltaMessage): WsEvent | null {
+    if (data.type === 'ui_snapshot') {
+      this.state = data.state;
+      this.version = data.version ?? -1;
+      this.resyncPending = false;
+      return data;
+    }
+
+    if (data.type !== 'ui_snapshot_delta') return data;
+
+    if (data.version <= this.version) return null;
+    if (!this.state || data.base_version !== this.version) {
+      if (!this.resyncPending) {
+        this.resyncPending = true;
+        this.socket?.send(JSON.stringify({type: 'resync'}));
+      }
+      return null;
+    }
+
+    const changes = data.changes as Record<string, unknown>;
+    const state = {...this.state} as Record<string, any>;
+    for (const section of ['hens', 'lights_by_hen', 'feeds_by_silo']) {
+      if (changes[section]) {
+        state[section] = {...(state[section] ?? {}), ...(changes[section] as object)};
+      }
+    }
+    for (const section of ['feed', 'light']) {
+      if (changes[section]) state[section] = changes[section];
+    }
+
+    this.state = state as UiState;
+    this.version = data.version;
+    return {type: 'ui_snapshot', ts: data.ts, version: data.version, state: this.state};
+  }
+
 }